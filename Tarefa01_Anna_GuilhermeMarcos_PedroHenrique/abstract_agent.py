@@ -89,7 +89,8 @@ class AbstAgent(ABC):
     def deliberate(self) -> bool:
         """ This is the choice of the next action. The simulator calls this
         method at each reasonning cycle if and only if the agent is ACTIVE.
-        Must be implemented in every agent. The agent should execute only on walk acton per deliberation.
+        Must be implemented in every agent. The agent should execute only on walk acton per deliberation,
+        or one follow_path for a known route.
         @return True: there's one or more actions to do
         @return False: there's no more action to do """
 
@@ -105,8 +106,22 @@ class AbstAgent(ABC):
         return self.__body._state
 
     def set_state(self, value):
-        """ This protected method allows the environment to change the state of the agent"""
+        """ This protected method allows the environment to change the state of the agent.
+        It also wakes up the agent if it is waiting (see wait)"""
         self.__body._state = value
+        self.__body._waiting = None
+
+    def wait(self, condition):
+        """ Public method for suspending the agent until a condition is signalled by another agent
+        through notify, until its state is set or until another agent ends. Meanwhile the environment
+        does not call deliberate, which should check the condition again when the agent wakes up.
+        @param condition: the name of the condition, e.g. "exploration finished" """
+        self.__env.wait(self.__body, condition)
+
+    def notify(self, condition):
+        """ Public method for waking up the agents waiting for a condition
+        @param condition: the name of the condition """
+        self.__env.notify(condition)
 
     def get_env(self):
         """ This protected method allows the environment to change the state of the agent"""
@@ -122,6 +137,29 @@ class AbstAgent(ABC):
         In every case, action's executing time is discounted from time limit"""
         return self.__body._walk(dx, dy)
 
+    def follow_path(self, moves):
+        """ Public method for walking a known route in a single action. The steps are executed one by
+        one, as walk does, and the first step not executed ends the route.
+        @param moves: a sequence of pairs (dx, dy), each coordinate in {-1, 0, 1}
+        @returns: a pair (result, steps)
+        - result: VS.EXECUTED if the whole route was walked, or the result of the failed step
+          (VS.BUMPED or VS.TIME_EXCEEDED)
+        - steps: the number of executed steps
+        In every case, the time of the steps tried is discounted from time limit"""
+        return self.__body._follow_path(moves)
+
+    def declare_plan(self, plan, done=None):
+        """ Public method for declaring that the agent is following a fixed plan. While every ACTIVE
+        agent has a declared, non empty plan, the environment executes the plans itself (fast-forward)
+        and does not call deliberate: at each cycle, the steps up to the next one with vict True are
+        removed from the plan and walked as by follow_path, then the first aid is delivered. The
+        declaration ends when the plan gets empty or when a step cannot be executed (the failed step
+        is removed too, without being done); then deliberate is called again.
+        @param plan: the list of steps (dx, dy, vict), consumed in place by the environment
+        @param done: an optional list where the steps executed by the environment are appended"""
+        self.__body._plan = plan
+        self.__body._plan_done = done
+
     def check_walls_and_lim(self):
         """ Public method for checking walls and the grid limits in the neighborhood of the current position of the agent.
         @returns: a vector of eight integers indexed in a clockwise manner. The first position in the vector is the position
@@ -133,6 +171,14 @@ class AbstAgent(ABC):
         """
         return self.__body._check_walls_and_lim()
 
+    def sense(self):
+        """ Public method for sensing the current position of the agent in a single call: the walls
+        and grid limits around it and the victim on it. Sensing again before walking costs nothing.
+        @returns: a pair (obstacles, seq)
+        - obstacles: a tuple of eight integers as in check_walls_and_lim
+        - seq: the sequential number of the victim as in check_for_victim, or VS.NO_VICTIM """
+        return self.__body._sense()
+
     def check_for_victim(self):
         """ Public method for testing if there is a victim at the current position of the agent.
         The victim sequential number starts at zero. Zero corresponds to the first victim of the
@@ -0,0 +1,78 @@
+# Assignment
+#
+# Solves the linear assignment problem: given a cost matrix with one row per agent
+# and one column per task, choose one distinct task per agent with the least total
+# cost. It is the Hungarian method in its shortest augmenting path form (Jonker and
+# Volgenant): each row is added in turn and the matching is augmented along the
+# cheapest path of reduced costs. The scans over the columns are NumPy operations,
+# so a problem with tens of rows and hundreds of columns takes well under a
+# millisecond.
+
+import numpy as np
+
+
+def assign(cost):
+    """ Least-cost assignment of rows to columns
+    @param cost: a 2D array; when there are more rows than columns, only as many
+                 rows as columns are assigned
+    @return: an array with the column assigned to each row, or -1 if the row is
+             left without a column """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.shape[0] > cost.shape[1]:
+        cols = assign(cost.T)
+        rows = np.full(cost.shape[0], -1, dtype=np.intp)
+        assigned = cols >= 0
+        rows[cols[assigned]] = np.nonzero(assigned)[0]
+        return rows
+
+    n, m = cost.shape
+    u = np.zeros(n)                             # potentials of the rows
+    v = np.zeros(m)                             # potentials of the columns
+    col4row = np.full(n, -1, dtype=np.intp)
+    row4col = np.full(m, -1, dtype=np.intp)
+    path = np.zeros(m, dtype=np.intp)           # previous row on the augmenting path
+
+    for cur in range(n):
+        # Dijkstra search over the reduced costs, from row cur to a free column
+        dist = np.full(m, np.inf)
+        blocked = np.zeros(m)                   # inf for the columns already reached
+        rows, cols = [], []
+        min_val = 0.0
+        i = cur
+        while True:
+            rows.append(i)
+            reduced = cost[i] - v
+            reduced += min_val - u[i]
+            reduced += blocked
+            better = reduced < dist
+            path[better] = i
+            np.minimum(dist, reduced, out=dist)
+
+            # a blocked column comes out only when every column is out of reach
+            masked = dist + blocked
+            j = int(np.argmin(masked))
+            min_val = masked[j]
+            if min_val == np.inf:
+                raise ValueError("the cost matrix has no feasible assignment")
+            blocked[j] = np.inf
+            cols.append(j)
+            if row4col[j] < 0:
+                break
+            i = row4col[j]
+
+        # update the potentials
+        u[cur] += min_val
+        for i in rows[1:]:
+            u[i] += min_val - dist[col4row[i]]
+        for j in cols:
+            v[j] -= min_val - dist[j]
+
+        # augment the matching along the path that ends at the free column j
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur:
+                break
+
+    return col4row
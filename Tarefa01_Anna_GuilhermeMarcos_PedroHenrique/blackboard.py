@@ -0,0 +1,69 @@
+# Blackboard
+#
+# The exploration knowledge shared by a team of explorers: one map, with its
+# frontier and cost-to-base field, and the victims already read. Every explorer
+# of the team reads and writes these structures at each cycle, so a cell walked
+# by one of them is known by all of them.
+#
+# An explorer heading to a frontier cell claims it; the other explorers choose
+# among the unclaimed cells, so two explorers do not travel to the same place.
+# Each explorer holds at most one claim. An optional ExplorerManager may hand
+# the explorers their targets instead.
+
+from map import Map
+from frontier import Frontier
+from cost_field import CostField
+
+
+class FreeCells:
+    """ A view of the frontier cells not claimed by other explorers """
+
+    def __init__(self, blackboard, owner):
+        self.blackboard = blackboard
+        self.owner = owner
+
+    def __contains__(self, coord):
+        if coord not in self.blackboard.frontier:
+            return False
+        return self.blackboard.claims.get(coord, self.owner) is self.owner
+
+
+class Blackboard:
+    def __init__(self):
+        self.map = None
+        self.frontier = Frontier()
+        self.cost_field = None
+        self.victims = {}       # (seq): ((x,y), [<vs>]) of the victims already read
+        self.known_victims = []
+        self.claims = {}        # (x, y): the explorer heading to the cell
+        self.claimed = {}       # explorer: the cell it claimed
+        self.explorers = []     # the explorers of the team
+        self.manager = None     # an ExplorerManager that assigns the targets
+
+    def join(self, explorer, path_priorities):
+        """ Adds an explorer to the team. The first one sets the walk costs of the
+        cost-to-base field, which all the explorers of the team must share.
+        @param explorer: an Explorer
+        @param path_priorities: the explorer's path priorities """
+        self.explorers.append(explorer)
+        if self.map is None:
+            self.cost_field = CostField(explorer.COST_LINE, explorer.COST_DIAG)
+            self.map = Map(path_priorities, self.cost_field, self.frontier)
+        elif (explorer.COST_LINE, explorer.COST_DIAG) != (self.cost_field.cost_line, self.cost_field.cost_diag):
+            raise ValueError(f"{explorer.NAME}: walk costs differ from the team's")
+
+    def free_frontier(self, owner):
+        """ @return: a container with the frontier cells free for owner to claim """
+        return FreeCells(self, owner)
+
+    def claim(self, coord, owner):
+        """ Claims the frontier cell coord for owner, releasing its previous claim """
+        self.release(owner)
+        self.claims[coord] = owner
+        self.claimed[owner] = coord
+
+    def release(self, owner):
+        """ Releases the claim of owner, if any """
+        coord = self.claimed.pop(owner, None)
+        if coord is not None and self.claims.get(coord) is owner:
+            del self.claims[coord]
@@ -0,0 +1,121 @@
+# Cost field
+#
+# The least cost to walk from each known cell back to the base, kept up to date
+# while the explorer discovers new cells. The map calls add for every cell it
+# stores, and the field is repaired from the changed cell only, as in a Dijkstra
+# search seeded with that cell: adding a cell (or finding that a cell is easier
+# to enter) can only lower the costs, so just the cells whose cost drops are
+# visited. The rare case where a known cell turns out to be harder to enter
+# rebuilds the whole field. The difficulty of a cell is measured from the time of
+# a walk, so entering it again may give a slightly different value: differences
+# within a relative tolerance (DIFFICULTY_TOL) are ignored.
+#
+# Entering a cell costs COST_LINE or COST_DIAG times its difficulty, as in search.py.
+# Each cell also keeps the next cell of its least-cost path, so the way back
+# to the base is read by following these links.
+
+import heapq
+import math
+from constants import VS
+from search import NEIGHBOURS, step_cost
+
+
+class CostField:
+    DIFFICULTY_TOL = 1e-6   # relative difference below which two difficulties are the same
+
+    def __init__(self, cost_line, cost_diag, base=(0, 0)):
+        """ @param cost_line, cost_diag: the costs of the walk actions of the agent
+            @param base: the position where the paths end """
+        self.cost_line = cost_line
+        self.cost_diag = cost_diag
+        self.base = base
+        self.difficulty = {}    # (x, y): difficulty of the known cells (walls excluded)
+        self.dist = {}          # (x, y): least cost from the cell to the base
+        self.next = {}          # (x, y): the next cell on the way to the base
+        self.max_difficulty = VS.OBST_NONE  # the hardest known cell
+
+    def add(self, coord, difficulty):
+        """ Stores a cell and repairs the costs it affects
+        @param coord: a pair (x, y)
+        @param difficulty: the degree of difficulty to enter the cell """
+        old = self.difficulty.get(coord)
+        if difficulty >= VS.OBST_WALL:
+            if old is not None:
+                # a known cell became a wall: the paths through it are lost
+                del self.difficulty[coord]
+                self.__rebuild()
+            return
+
+        if old is not None and math.isclose(old, difficulty, rel_tol=CostField.DIFFICULTY_TOL):
+            return
+
+        self.difficulty[coord] = difficulty
+        if difficulty > self.max_difficulty:
+            self.max_difficulty = difficulty
+
+        if old is not None and difficulty > old:
+            self.__rebuild()
+            return
+
+        # the least cost of the new cell comes from its known neighbours
+        if coord == self.base:
+            self.dist[coord] = 0.0
+            self.next.pop(coord, None)
+        else:
+            for dx, dy in NEIGHBOURS:
+                neighbour = (coord[0] + dx, coord[1] + dy)
+                if neighbour not in self.dist:
+                    continue
+                step = step_cost(dx, dy, self.cost_line, self.cost_diag)
+                cost = step * self.difficulty[neighbour] + self.dist[neighbour]
+                if cost < self.dist.get(coord, float('inf')):
+                    self.dist[coord] = cost
+                    self.next[coord] = neighbour
+
+        if coord in self.dist:
+            self.__relax([(self.dist[coord], coord)])
+
+    def cost(self, coord):
+        """ @return: the least cost to walk from coord to the base over the known
+            cells, or infinity if there is no known path """
+        return self.dist.get(coord, float('inf'))
+
+    def path_to_base(self, coord):
+        """ @return: the positions to walk from coord to the base, without coord,
+            or None if there is no known path """
+        if coord not in self.dist:
+            return None
+
+        path = []
+        while coord != self.base:
+            coord = self.next[coord]
+            path.append(coord)
+        return path
+
+    def __relax(self, open_heap):
+        """ Lowers the costs of the cells that reach the base more cheaply through
+        the cells in open_heap, a heap of (cost, (x, y)) """
+        while open_heap:
+            dist, current = heapq.heappop(open_heap)
+            if dist > self.dist[current]:
+                continue    # stale entry: the cost of the cell dropped again
+
+            enter = self.difficulty[current]
+            for dx, dy in NEIGHBOURS:
+                neighbour = (current[0] - dx, current[1] - dy)
+                if neighbour not in self.difficulty:
+                    continue
+                step = step_cost(dx, dy, self.cost_line, self.cost_diag)
+                cost = dist + step * enter
+                if cost < self.dist.get(neighbour, float('inf')):
+                    self.dist[neighbour] = cost
+                    self.next[neighbour] = current
+                    heapq.heappush(open_heap, (cost, neighbour))
+
+    def __rebuild(self):
+        """ Recomputes the whole field from the base """
+        self.dist = {}
+        self.next = {}
+        if self.base in self.difficulty:
+            self.dist[self.base] = 0.0
+            self.__relax([(0.0, self.base)])
@@ -0,0 +1,236 @@
+# Distance service
+#
+# Travel costs between the victims (and the base) over the map known by the
+# explorers. Entering a cell costs COST_LINE or COST_DIAG times its difficulty,
+# as in search.py, so the costs are the times a rescuer would spend walking.
+#
+# The known passable cells are numbered and their 8-neighbour adjacency is built
+# once with NumPy. Then one Dijkstra search runs from each point; it stops as
+# soon as every point has been reached. The searches are spread over a pool of
+# processes, each worker receiving the graph once, unless the service runs in a
+# daemonic process (e.g. an exp_runner worker), which cannot have children: then
+# the searches run one after the other. The result is a dense float32
+# matrix, matrix[i, j] being the cost from point i to point j (inf when there is
+# no known path), and the search trees, kept to give the paths afterwards.
+#
+# Both arrays are saved as .npy files in a cache folder, named by a hash of what
+# determines them: the known map, the points and the walk costs. A later run on
+# the same data loads them memory-mapped instead of running the searches again.
+
+import hashlib
+import heapq
+import os
+import tempfile
+from multiprocessing import Pool, current_process
+import numpy as np
+from constants import VS
+from search import NEIGHBOURS, step_cost
+
+# the graph of the searches run by a pool worker process (see _init_worker); each
+# worker has its own copy, set once when the worker starts
+_graph = None
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _search_in_worker(source):
+    return _search(_graph, source)
+
+
+def _search(graph, source):
+    """ Dijkstra search from one cell until every target cell is reached
+    @param graph: a pair (adjacency lists, target cells), see DistanceService.compute
+    @param source: the number of the start cell, or -1 for a point out of the map
+    @return: (costs, pred): the costs to the targets (float32) and the previous cell
+             of each cell on its least-cost path from source (int32, -1 if none) """
+    adj, targets = graph
+    n = len(adj)
+    inf = float('inf')
+    dist = [inf] * n
+    pred = [-1] * n
+
+    if source >= 0:
+        is_target = bytearray(n)
+        for t in targets:
+            if t >= 0:
+                is_target[t] = 1
+        remaining = sum(is_target)
+
+        dist[source] = 0.0
+        open_heap = [(0.0, source)]
+        while open_heap and remaining:
+            d, u = heapq.heappop(open_heap)
+            if d > dist[u]:
+                continue    # stale entry
+            if is_target[u]:
+                remaining -= 1
+            for v, w in adj[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(open_heap, (nd, v))
+
+    costs = np.array([dist[t] if t >= 0 else inf for t in targets], dtype=np.float32)
+    return costs, np.array(pred, dtype=np.int32)
+
+
+class DistanceService:
+    CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+    def __init__(self, map, cost_line, cost_diag, processes=None, cache_folder=CACHE_FOLDER):
+        """ @param map: the Map known by the explorers (the merged one, when they share a Blackboard)
+            @param cost_line, cost_diag: the costs of the walk actions of the rescuers
+            @param processes: the number of worker processes (None = number of cpus, or 1 in
+                              a daemonic process)
+            @param cache_folder: the folder of the cached matrices (None = no cache) """
+        self.cost_line = cost_line
+        self.cost_diag = cost_diag
+        if processes is None:
+            processes = 1 if current_process().daemon else os.cpu_count()
+        self.processes = processes
+        self.cache_folder = cache_folder
+
+        # number the known passable cells
+        difficulty = map.difficulty
+        self.map_hash = self.__hash_map(difficulty, map.origin_x, map.origin_y)
+        passable = difficulty < VS.OBST_WALL     # False for the unknown cells (NaN)
+        self.origin = (map.origin_x, map.origin_y)
+        self.cells = np.argwhere(passable)        # array indexes of each cell
+        self.index = np.full(difficulty.shape, -1, dtype=np.int32)
+        self.index[passable] = np.arange(len(self.cells), dtype=np.int32)
+
+        self.adj = self.__adjacency(difficulty, passable)
+        self.points = []
+        self.matrix = None
+        self.pred = None
+
+    def __hash_map(self, difficulty, origin_x, origin_y):
+        """ @return: a sha256 object fed with the known map and the walk costs """
+        h = hashlib.sha256()
+        h.update(np.array([origin_x, origin_y, *difficulty.shape], dtype=np.int64).tobytes())
+        h.update(np.array([self.cost_line, self.cost_diag], dtype=np.float64).tobytes())
+        h.update(np.nan_to_num(difficulty, nan=-1.0).astype(np.float64).tobytes())
+        return h
+
+    def cache_key(self, points):
+        """ @return: the hex digest naming the cached arrays of points on this map """
+        h = self.map_hash.copy()
+        h.update(np.array(points, dtype=np.int64).reshape(-1, 2).tobytes())
+        return h.hexdigest()
+
+    def __adjacency(self, difficulty, passable):
+        """ @return: for each cell, the list of (neighbour, cost to enter the neighbour) """
+        width, height = passable.shape
+        padded = np.full((width + 2, height + 2), -1, dtype=np.int32)
+        padded[1:-1, 1:-1] = self.index
+        cost = np.zeros((width + 2, height + 2))
+        cost[1:-1, 1:-1] = np.where(passable, difficulty, 0)
+
+        src, dst, weight = [], [], []
+        xs = self.cells[:, 0] + 1
+        ys = self.cells[:, 1] + 1
+        for dx, dy in NEIGHBOURS:
+            step = step_cost(dx, dy, self.cost_line, self.cost_diag)
+            neighbour = padded[xs + dx, ys + dy]
+            ok = neighbour >= 0
+            src.append(padded[xs[ok], ys[ok]])
+            dst.append(neighbour[ok])
+            weight.append(step * cost[xs[ok] + dx, ys[ok] + dy])
+
+        src = np.concatenate(src)
+        order = np.argsort(src, kind='stable')
+        src = src[order]
+        dst = np.concatenate(dst)[order].tolist()
+        weight = np.concatenate(weight)[order].tolist()
+        bounds = np.searchsorted(src, np.arange(len(self.cells) + 1)).tolist()
+
+        return [list(zip(dst[bounds[u]:bounds[u + 1]], weight[bounds[u]:bounds[u + 1]]))
+                for u in range(len(self.cells))]
+
+    def cell_of(self, coord):
+        """ @return: the number of the cell at coord, or -1 if it is not a known passable cell """
+        ix = coord[0] + self.origin[0]
+        iy = coord[1] + self.origin[1]
+        if 0 <= ix < self.index.shape[0] and 0 <= iy < self.index.shape[1]:
+            return int(self.index[ix, iy])
+        return -1
+
+    def compute(self, points):
+        """ Computes the travel costs between every pair of points
+        @param points: a list of positions (x, y), e.g. the base followed by the victims
+        @return: the float32 matrix of the costs, matrix[i, j] from points[i] to points[j] """
+        self.points = list(points)
+        if self.__load():
+            return self.matrix
+
+        targets = [self.cell_of(p) for p in self.points]
+        graph = (self.adj, targets)
+
+        if self.processes > 1 and len(targets) > 1:
+            chunksize = max(1, len(targets) // (4 * self.processes))
+            with Pool(self.processes, initializer=_init_worker, initargs=(graph,)) as pool:
+                results = pool.map(_search_in_worker, targets, chunksize)
+        else:
+            results = [_search(graph, t) for t in targets]
+
+        self.matrix = np.stack([costs for costs, _ in results]) if results else \
+            np.zeros((0, 0), dtype=np.float32)
+        self.pred = np.stack([pred for _, pred in results]) if results else \
+            np.zeros((0, len(self.cells)), dtype=np.int32)
+        self.__save()
+        return self.matrix
+
+    def __cache_files(self):
+        key = self.cache_key(self.points)
+        return (os.path.join(self.cache_folder, f"{key}.matrix.npy"),
+                os.path.join(self.cache_folder, f"{key}.pred.npy"))
+
+    def __load(self):
+        """ Loads the cached arrays of self.points, memory-mapped and read only
+        @return: True if they were in the cache """
+        if self.cache_folder is None:
+            return False
+        matrix_file, pred_file = self.__cache_files()
+        try:
+            matrix = np.load(matrix_file, mmap_mode='r')
+            pred = np.load(pred_file, mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        if matrix.shape != (len(self.points), len(self.points)) or \
+                pred.shape != (len(self.points), len(self.cells)):
+            return False
+        self.matrix, self.pred = matrix, pred
+        return True
+
+    def __save(self):
+        """ Saves the arrays of self.points in the cache; each file is written under a
+        unique temporary name and then renamed, so a concurrent run (another process or
+        thread) never reads half a file """
+        if self.cache_folder is None:
+            return
+        os.makedirs(self.cache_folder, exist_ok=True)
+        for file, array in zip(self.__cache_files(), (self.matrix, self.pred)):
+            with tempfile.NamedTemporaryFile(dir=self.cache_folder, suffix=".tmp",
+                                             delete=False) as f:
+                np.save(f, array)
+            os.replace(f.name, file)
+
+    def path(self, i, j):
+        """ @return: the positions (x, y) from points[i] to points[j] (both included) on the
+            least-cost path, or None if there is no known path """
+        if not np.isfinite(self.matrix[i, j]):
+            return None
+
+        source = self.cell_of(self.points[i])
+        cell = self.cell_of(self.points[j])
+        cells = [cell]
+        while cell != source:
+            cell = int(self.pred[i, cell])
+            cells.append(cell)
+
+        ox, oy = self.origin
+        return [(int(self.cells[c, 0]) - ox, int(self.cells[c, 1]) - oy) for c in reversed(cells)]
@@ -3,17 +3,22 @@
 
 import sys
 import os
-import pygame
 import random
 import csv
 import time
 import math
 import colorsys
+import numpy as np
+try:
+    import pygame
+except ImportError:     # pygame is only needed when the simulation is rendered
+    pygame = None
 from abstract_agent import AbstAgent
 from physical_agent import PhysAgent
 from constants import VS
 from decision_tree import DecisionTree
 from fuzzy import Fuzzy
+from victim_stats import VictimStats
 
 
 # Class Environment
@@ -22,29 +27,61 @@ class Env:
     IDX_GRAVITY = 6
     IDX_sev_label = 7
 
-    def __init__(self, data_folder):
+    # The classifiers' training data is relative to the simulator folder, not to the current
+    # working directory; so are the output files by default (see output_folder)
+    FOLDER = os.path.dirname(os.path.abspath(__file__))
+    CLASSIFIER_DATA = os.path.join(FOLDER, "datasets", "data_800v", "env_vital_signals.txt")
+    PREDICTIONS_FILE = "output_file_decision_tree.txt"
+
+    # Increments to the 8 neighbours of a cell, in the clockwise order of check_walls_and_lim
+    NEIGHBOURS = [(0, -1), (1, -1), (1, 0), (1, 1),
+                  (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+
+    def __init__(self, data_folder, headless=False, setup=None, output_folder=FOLDER):
         # instance attributes
         self.data_folder = data_folder  # folder for the config and data files
+        # folder for the output files (predictions, clusters) or None for not writing them;
+        # simulations running at the same time need different folders
+        self.output_folder = output_folder
+        # headless mode: no window, no delay and no keyboard prompts
+        self.headless = headless
+        # function setup(env) that creates the agents of the simulation (called by reset)
+        self.setup = setup
+        self.cycle = 0         # number of executed cycles
+        self.done = False      # True when there is no more active or idle agents
         self.dic = {}          # configuration of grid and window
         self.agents = []       # list of running agents
-        # list of obstacles: ]0.0, VS.OBST_WALL] float representing the multiplying factor for the walk action
+        # grid of obstacles: ]0.0, VS.OBST_WALL] float representing the multiplying factor for the walk action
         self.obst = None
         # for an agent to enter into a cell.
+        # bitmasks of the neighbours of each cell: bit i is set when the i-th neighbour (see NEIGHBOURS)
+        self.wall_mask = None   # is a wall
+        self.end_mask = None    # is out of the grid (end of the grid)
+        # results of check_walls_and_lim per pair of masks (wall, end)
+        self.__neighbours_lut = {}
         # explorer agent cannot access this attribute, it has to find!
         self.nb_of_victims = 0  # total number of victims
         # positional: the coordinates of the victims [(x1,y1), ..., (xn, yn)]
         self.victims = []
+        # index of the victims by position: {(x, y): victim sequential number}
+        self.victim_at = {}
+        # all the victims at each position, in the order of the file: {(x, y): [seq, ...]}
+        self.victims_in_cell = {}
         # positional: the injury sev_label for each victim (label)
         self.sev_label = []
         # positional: the injury gravity for each victim (float value)
         self.sev_value = []
         self.sum_gravity = 0   # sum of all gravity values for peg and psg calculation
+        self.sev_count = [0, 0, 0, 0]  # number of victims per severity label [1, 2, 3, 4]
         # positional: the vital signals of the victims [[i,s1,...,s5,g,l],...]
         self.signals = []
         # positional: Physical agents that found each victim [[ag1] [ag2, ag3], ...] ag1 found vict 0, ag2 and 3, vict 1, ...
         self.found = [[]]
         # positional: Physical agents that saved each victim
         self.saved = [[]]
+        # victims found and saved by all the agents, with running counters per severity
+        self.found_stats = VictimStats()
+        self.saved_stats = VictimStats()
         self.__max_obst = 0             # max value for obstacle for coloring - to be calculated
         # min value for obstacle for coloring - to be calculated
         self.__min_obst = VS.OBST_WALL
@@ -53,10 +90,10 @@ class Env:
         self.__read_config()
         # print(self.dic)
 
-        # Set up the obstacles - it's a list composed of GRID_WIDTH lists. Each sublist is a column (y=0, 1, ...)
+        # Set up the obstacles - it's an array of GRID_WIDTH x GRID_HEIGHT indexed by [x, y]
         # 1 means that there is no obstacle - it is a regular terrain
-        self.obst = [[1 for y in range(self.dic["GRID_HEIGHT"])]
-                     for x in range(self.dic["GRID_WIDTH"])]
+        self.obst = np.full(
+            (self.dic["GRID_WIDTH"], self.dic["GRID_HEIGHT"]), VS.OBST_NONE, dtype=np.float64)
         obst_file = os.path.join(self.data_folder, "env_obst.txt")
         self.__max_obst = 1
 
@@ -87,9 +124,11 @@ class Env:
                 if obst != VS.OBST_WALL and obst > self.__max_obst:
                     self.__max_obst = obst
 
-                self.obst[x][y] = obst
+                self.obst[x, y] = obst
                 # print(self.obst)
 
+        self.__build_neighbours_masks()
+
         # print(f"ENV: max_obst = {self.__max_obst} min_obst={self.__min_obst}")
         # Read and put the victims into the grid
 
@@ -100,6 +139,9 @@ class Env:
             for row in csvreader:
                 x = int(row[0])
                 y = int(row[1])
+                # the first victim at a position is the one found there
+                self.victim_at.setdefault((x, y), len(self.victims))
+                self.victims_in_cell.setdefault((x, y), []).append(len(self.victims))
                 self.victims.append((x, y))   # append tuples
 
         self.nb_of_victims = len(self.victims)
@@ -124,6 +166,7 @@ class Env:
                 self.sev_label.append(lb)
                 self.sev_value.append(gr)
                 self.sum_gravity = self.sum_gravity + gr
+                self.sev_count[lb - 1] += 1
 
         if self.nb_of_victims > len(self.signals):
             print("ENV: number of victims of env_victims.txt greater than vital signals")
@@ -134,25 +177,46 @@ class Env:
             print("ENV: nb of victims of env_victims.txt less than vital signals")
             print("ENV: Assuming nb of victims of env_victims.txt")
 
-        self.accuracy_tree, self.data_tree = self.decisionTree.train_model(data_path='datasets/data_800v/env_vital_signals.txt',
+        self.accuracy_tree, self.data_tree = self.decisionTree.train_model(data_path=Env.CLASSIFIER_DATA,
                                                                            test_size=0.2)
 
-        self.accuracy_fuzzy, self.data_fuzzy, self.predictions_fuzzy = self.fuzzy.train_model(data_path='datasets/data_800v/env_vital_signals.txt',
+        self.accuracy_fuzzy, self.data_fuzzy, self.predictions_fuzzy = self.fuzzy.train_model(data_path=Env.CLASSIFIER_DATA,
                                                                                               test_size=0.2)
-        if (self.accuracy_fuzzy > self.accuracy_tree):
-            self.fuzzy.save_predictions_to_csv(
-                self.data_fuzzy, self.predictions_fuzzy, 'output_file_decision_tree.txt')
-        else:
-            self.decisionTree.save_predictions_to_csv(
-                self.data_tree, 'output_file_decision_tree.txt')
+        if self.output_folder is not None:
+            predictions_file = os.path.join(self.output_folder, Env.PREDICTIONS_FILE)
+            if (self.accuracy_fuzzy > self.accuracy_tree):
+                self.fuzzy.save_predictions_to_csv(
+                    self.data_fuzzy, self.predictions_fuzzy, predictions_file)
+            else:
+                self.decisionTree.save_predictions_to_csv(
+                    self.data_tree, predictions_file)
+
+        self.__background = None  # static layer of the grid (see __draw_background)
+        self.__reset_state()
+
+    def __reset_state(self):
+        """ Sets up the state that changes along the simulation """
+
+        self.agents = []
+        self.cycle = 0
+        self.done = False
 
         # Set up found and saved victims' lists
         self.found = [[] for v in range(self.nb_of_victims)]
         self.saved = [[] for v in range(self.nb_of_victims)]
+        self.found_stats = VictimStats()
+        self.saved_stats = VictimStats()
 
-        # Set up with the trace color of the last physical agent who visited the cell
-        self.visited = [[[] for y in range(self.dic["GRID_HEIGHT"])] for x in range(
-            self.dic["GRID_WIDTH"])]
+        # Set up the agents who visited each cell: a mask of bits per cell, the bit i
+        # is set when the i-th added agent visited the cell (see add_agent)
+        self.visited = np.zeros(
+            (self.dic["GRID_WIDTH"], self.dic["GRID_HEIGHT"]), dtype=np.uint16)
+
+        # Cells (x, y) changed since the last frame: only these are redrawn
+        self.dirty = set()
+
+        # The agents waiting for each condition (see wait and notify)
+        self.waiting = {}
 
     # def save_predictions_to_csv(self, data, output_file, better_accuracy, predictions):
 
@@ -194,6 +258,71 @@ class Env:
 
                 self.dic[keyword] = value
 
+    def __build_neighbours_masks(self):
+        """ Calculates the walls and the end of grid around each cell as two bitmasks,
+        so checking the neighbourhood of an agent is a lookup instead of 8 tests"""
+
+        width = self.dic["GRID_WIDTH"]
+        height = self.dic["GRID_HEIGHT"]
+
+        # pad the grid with one cell outside of the limits in every direction
+        walls = np.pad(self.obst == VS.OBST_WALL, 1, constant_values=False)
+        ends = np.pad(np.zeros((width, height), dtype=bool), 1, constant_values=True)
+
+        self.wall_mask = np.zeros((width, height), dtype=np.uint8)
+        self.end_mask = np.zeros((width, height), dtype=np.uint8)
+        for i, (dx, dy) in enumerate(Env.NEIGHBOURS):
+            self.wall_mask |= walls[1+dx:1+dx+width, 1+dy:1+dy+height].astype(np.uint8) << i
+            self.end_mask |= ends[1+dx:1+dx+width, 1+dy:1+dy+height].astype(np.uint8) << i
+
+    def check_neighbours(self, x, y):
+        """ Returns the walls and the end of grid around the cell (x, y)
+        @returns: a list of eight integers as in check_walls_and_lim, {CLEAR, WALL, END}"""
+
+        key = (int(self.wall_mask[x, y]), int(self.end_mask[x, y]))
+        obstacles = self.__neighbours_lut.get(key)
+
+        if obstacles is None:
+            wall, end = key
+            obstacles = [VS.CLEAR] * 8
+            for i in range(8):
+                if end >> i & 1:
+                    obstacles[i] = VS.END
+                elif wall >> i & 1:
+                    obstacles[i] = VS.WALL
+            self.__neighbours_lut[key] = obstacles
+
+        return list(obstacles)
+
+    def wait(self, body, condition):
+        """ This public method suspends an ACTIVE agent until the condition is signalled by notify,
+        the state of the agent is set or another agent ends (see __end). A waiting agent is not asked
+        to deliberate; once woken up, it checks its condition again.
+        @param body: the physical agent
+        @param condition: the name of the condition """
+
+        body._waiting = condition
+        self.waiting.setdefault(condition, []).append(body)
+
+    def notify(self, condition):
+        """ This public method wakes up the agents waiting for the condition
+        @param condition: the name of the condition """
+
+        for body in self.waiting.pop(condition, []):
+            if body._waiting == condition:
+                body._waiting = None
+
+    def __end(self, body, state):
+        """ This private method ends an agent (VS.ENDED or VS.DEAD). The ended agent will never
+        signal the conditions others may be waiting for, so every waiting agent is woken up to
+        check its condition again, e.g. the end of the exploration when an explorer dies.
+        @param body: the physical agent
+        @param state: the final state of the agent """
+
+        body._state = state
+        for condition in list(self.waiting):
+            self.notify(condition)
+
     def add_agent(self, ag, state=VS.IDLE):
         """ This public method adds an agent to the simulator.
         It creates a representation for the agent in the 2D environment
@@ -205,17 +334,41 @@ class Env:
         body = PhysAgent(
             ag, self, self.dic["BASE"][0], self.dic["BASE"][1], state)
         self.agents.append(body)
+
+        # each agent has one bit in the visited mask: widen the mask when it is full
+        nb_of_bits = len(self.agents)
+        if nb_of_bits > 64:
+            print("ENV: more than 64 agents are not supported")
+            exit()
+        if nb_of_bits > 8 * self.visited.itemsize:
+            dtype = np.uint32 if nb_of_bits <= 32 else np.uint64
+            self.visited = self.visited.astype(dtype)
+        body._visit_bit = 1 << (nb_of_bits - 1)
+
         return body
 
-    def __draw(self):
-        """ This private method draw the grid and its items """
+    def get_visitors(self, x, y):
+        """ Public method for getting the agents who visited the cell (x, y)
+        @return: a list of physical agents in the order they were added"""
 
-        # Set cell width and height
-        cell_w = self.dic["WINDOW_WIDTH"]/self.dic["GRID_WIDTH"]
-        cell_h = self.dic["WINDOW_HEIGHT"]/self.dic["GRID_HEIGHT"]
+        mask = int(self.visited[x, y])
+        return [body for body in self.agents if mask & body._visit_bit]
 
-        # Clear the screen
-        self.screen.fill(VS.WHITE)
+    def get_coverage(self, body=None):
+        """ Public method for getting the number of visited cells
+        @param body: a physical agent or None for all the agents
+        @return: the number of cells visited by the agent (or by any agent)"""
+
+        if body is None:
+            return int(np.count_nonzero(self.visited))
+
+        return int(np.count_nonzero(self.visited & body._visit_bit))
+
+    def __obst_color_lut(self):
+        """ This private method calculates the color of each degree of difficulty of the
+        obstacles present in the grid. The obstacles never change after __init__, so
+        the colors are calculated once.
+        @return: a dictionary {difficulty: (r, g, b)}"""
 
         # configuration for obstacles coloring
         # h,  s,   lc, ld:
@@ -227,160 +380,328 @@ class Env:
         saturation = 0         # 40=Red  0  = Grayscale
         lightness_clear = 100  # 100= White
         lightness_dark = 40  # 0  = Black
-        # configuration for ploting the trace marks
-        nb_of_ag = len(self.agents)
-        # print(f"ENV: number of agents {nb_of_ag}")
-        nb_of_rects = math.ceil(math.sqrt(nb_of_ag))
-        mark_radius = min(cell_w/nb_of_rects, cell_h/nb_of_rects) / 2
 
-        # Draw the grid
+        lut = {VS.OBST_WALL: VS.BLACK}  # wall
+        for difficulty in np.unique(self.obst).tolist():
+            if difficulty in lut:
+                continue
+
+            perc = difficulty/self.__max_obst
+            lightness = (1 - perc) * lightness_clear + \
+                perc * lightness_dark
+
+            # convert HSL color to RGB
+            rgb_color = colorsys.hls_to_rgb(
+                hue / 360.0, lightness / 100.0, saturation / 100.0)
+
+            # Convert RGB values to integers in the range [0, 255]
+            lut[difficulty] = tuple(int(c * 255) for c in rgb_color)
+
+        return lut
+
+    def __draw_background(self):
+        """ This private method pre-renders the static layer of the grid, the cells'
+        borders and the obstacles, into an off-screen surface"""
+
+        cell_w = self.__cell_w
+        cell_h = self.__cell_h
+        lut = self.__obst_color_lut()
+
+        self.__background = pygame.Surface(
+            (self.dic["WINDOW_WIDTH"], self.dic["WINDOW_HEIGHT"])).convert()
+        self.__background.fill(VS.WHITE)
+
         for x in range(self.dic["GRID_WIDTH"]):
             for y in range(self.dic["GRID_HEIGHT"]):
                 rect = pygame.Rect(x * cell_w, y * cell_h, cell_w, cell_h)
-                pygame.draw.rect(self.screen, VS.BLACK, rect, 1)
+                pygame.draw.rect(self.__background, VS.BLACK, rect, 1)
 
-                if self.obst[x][y] == VS.OBST_WALL:  # wall
-                    rgb_int = VS.BLACK
-                else:
-                    perc = self.obst[x][y]/self.__max_obst
-                    lightness = (1 - perc) * lightness_clear + \
-                        perc * lightness_dark
+                obst_rect = pygame.Rect(
+                    x * cell_w + 1, y * cell_h + 1, cell_w - 2, cell_h - 2)
+                pygame.draw.rect(self.__background,
+                                 lut[self.obst[x, y].item()], obst_rect)
 
-                    # convert HSL color to RGB
-                    rgb_color = colorsys.hls_to_rgb(
-                        hue / 360.0, lightness / 100.0, saturation / 100.0)
+    def __draw_cell(self, x, y):
+        """ This private method draws one cell of the grid: the static background
+        (border and obstacle) and the dynamic items over it, the trace marks, the base,
+        the victim and the active agents.
+        @return: the rectangle of the screen that was painted"""
 
-                    # Convert RGB values to integers in the range [0, 255]
-                    rgb_int = tuple(int(c * 255) for c in rgb_color)
+        cell_w = self.__cell_w
+        cell_h = self.__cell_h
 
-                obst_rect = pygame.Rect(
-                    x * cell_w + 1, y * cell_h + 1, cell_w - 2, cell_h - 2)
-                pygame.draw.rect(self.screen, rgb_int, obst_rect)
-
-                # Trace: plot a dot for each agent who has visited a cell
-                visitors = self.visited[x][y]
-                v = 0
-
-                if visitors:
-                    for i in range(nb_of_rects):
-                        for j in range(nb_of_rects):
-                            if v < len(visitors):
-                                trace_color = visitors[v].mind.TRACE_COLOR
-                                xc = x * cell_w + mark_radius * (i+1)
-                                yc = y * cell_h + mark_radius * (j+1)
-                                pygame.draw.circle(
-                                    self.screen, trace_color, (xc, yc), 0.7*mark_radius)
-                                v += 1
+        rect = pygame.Rect(x * cell_w, y * cell_h, cell_w, cell_h)
+        self.screen.blit(self.__background, rect, rect)
+
+        # Trace: plot a dot for each agent who has visited a cell
+        visitors = self.get_visitors(x, y)
+        v = 0
+
+        if visitors:
+            nb_of_rects = self.__nb_of_rects
+            mark_radius = self.__mark_radius
+            for i in range(nb_of_rects):
+                for j in range(nb_of_rects):
+                    if v < len(visitors):
+                        trace_color = visitors[v].mind.TRACE_COLOR
+                        xc = x * cell_w + mark_radius * (i+1)
+                        yc = y * cell_h + mark_radius * (j+1)
+                        pygame.draw.circle(
+                            self.screen, trace_color, (xc, yc), 0.7*mark_radius)
+                        v += 1
 
         # Draw a marker at the base
-        rect = pygame.Rect(self.dic["BASE"][0] * cell_w,
-                           self.dic["BASE"][1] * cell_h, cell_w, cell_h)
-        pygame.draw.rect(self.screen, VS.CYAN, rect, 4)
+        if x == self.dic["BASE"][0] and y == self.dic["BASE"][1]:
+            pygame.draw.rect(self.screen, VS.CYAN, rect, 4)
 
-        # Draw the victims
-        v = 0
-        for victim in self.victims:
+        # Draw the victims, the last one on top
+        for v in self.victims_in_cell.get((x, y), []):
             victim_rect = pygame.Rect(
-                victim[0] * cell_w + 2, victim[1] * cell_h + 2, cell_w - 4, cell_h - 4)
+                x * cell_w + 2, y * cell_h + 2, cell_w - 4, cell_h - 4)
             c = self.sev_label[v]-1
             pygame.draw.ellipse(self.screen, VS.VIC_COLOR_LIST[c], victim_rect)
             if self.saved[v] != []:
                 pygame.draw.ellipse(self.screen, VS.WHITE, victim_rect, 3)
             elif self.found[v] != []:
                 pygame.draw.ellipse(self.screen, VS.BLACK, victim_rect, 3)
-            v = v + 1
 
         # Draw the physical agents
         for body in self.agents:
-            if body._state == VS.ACTIVE:
-                # ag_rect = pygame.Rect(body.x * cell_w, body.y * cell_h, cell_w, cell_h)
-                # pygame.draw.rect(self.screen, body.mind.COLOR, ag_rect)
-                p_x1 = body.x * cell_w + 0.2 * cell_w
-                p_x2 = body.x * cell_w + cell_w/2
-                p_x3 = body.x * cell_w + 0.8 * cell_w
-                p_y1 = body.y * cell_h + cell_h/2
-                p_y2 = body.y * cell_h + 0.2 * cell_h
-                p_y3 = body.y * cell_h + 0.8 * cell_h
+            if body._state == VS.ACTIVE and body.x == x and body.y == y:
+                p_x1 = x * cell_w + 0.2 * cell_w
+                p_x2 = x * cell_w + cell_w/2
+                p_x3 = x * cell_w + 0.8 * cell_w
+                p_y1 = y * cell_h + cell_h/2
+                p_y2 = y * cell_h + 0.2 * cell_h
+                p_y3 = y * cell_h + 0.8 * cell_h
 
                 triangle = [(p_x1, p_y1), (p_x2, p_y2),
                             (p_x3, p_y1), (p_x2, p_y3)]
                 pygame.draw.polygon(self.screen, body.mind.COLOR, triangle)
-                active_idle = True
 
-        # Update the display
-        pygame.display.update()
+        return rect
+
+    def __draw(self, full=False):
+        """ This private method draws the grid and its items. Only the cells that changed
+        since the last frame are repainted (see self.dirty): the cells marked by the
+        physical agents plus the cells where the active agents were and are now.
+        @param full: True for repainting the whole grid (first frame, window exposed)"""
+
+        agent_cells = {(body.x, body.y)
+                       for body in self.agents if body._state == VS.ACTIVE}
+
+        if full:
+            # Set cell width and height
+            self.__cell_w = self.dic["WINDOW_WIDTH"]/self.dic["GRID_WIDTH"]
+            self.__cell_h = self.dic["WINDOW_HEIGHT"]/self.dic["GRID_HEIGHT"]
+
+            # configuration for ploting the trace marks
+            nb_of_ag = len(self.agents)
+            self.__nb_of_rects = math.ceil(math.sqrt(nb_of_ag))
+            self.__mark_radius = min(self.__cell_w/self.__nb_of_rects,
+                                     self.__cell_h/self.__nb_of_rects) / 2
+
+            # The static layer is rendered once
+            if self.__background is None:
+                self.__draw_background()
+
+            # Draw the static layer and the cells with dynamic items over it
+            self.screen.blit(self.__background, (0, 0))
+            cells = {(x, y) for x, y in np.argwhere(self.visited).tolist()}
+            cells.update(self.victim_at)
+            cells.update(agent_cells)
+            cells.add(tuple(self.dic["BASE"]))
+            for x, y in cells:
+                self.__draw_cell(x, y)
+
+            self.dirty.clear()
+            self.__agent_cells = agent_cells
+
+            # Update the display
+            pygame.display.update()
+            return
+
+        # the agents leave their previous cells and enter into the new ones
+        cells = self.dirty | self.__agent_cells | agent_cells
+        self.dirty.clear()
+        self.__agent_cells = agent_cells
+
+        rects = [self.__draw_cell(x, y) for x, y in cells]
+
+        # Update only the changed rectangles of the display
+        pygame.display.update(rects)
+
+    def reset(self):
+        """ This public method puts the environment back to its initial state, as it was
+        after __init__: no victim found or saved, no visited cell and no agent. Then, it
+        calls the setup function (see __init__) to create the agents again, so their minds
+        start from scratch too.
+        @return: the observations of the initial state (see get_observations)"""
+
+        self.__reset_state()
+        if self.setup is not None:
+            self.setup(self)
+
+        return self.get_observations()
+
+    def step(self):
+        """ This public method advances the simulation by one reasoning cycle. It calls the
+        deliberate method of each ACTIVE agent situated in the environment. Then, it updates
+        the state of the agents. It does not draw anything: see run for the interactive loop.
+        @return: the observations after the cycle (see get_observations)"""
+
+        # control whether or not there are active or idle agents
+        active_or_idle = False
+        deliberated = False
+
+        # ask each agent to deliberate the next action
+        for body in self.agents:
+
+            # Asks the agent to choose and to do the next action if it is ACTIVE
+            if body._state == VS.ACTIVE:
+                active_or_idle = True
+                if body._waiting is not None:
+                    continue    # nothing to do until the condition is signalled
+
+                deliberated = True
+                more_actions_to_do = body.mind.deliberate()
+
+                # if self.cycle % 50 == 0:
+                #    print(f"ENV: cycle {self.cycle} {body.mind.NAME} remaining: {body.rtime}")
+
+                # Test if the agent exceeded the time limit
+                if body._end_of_time():
+                    self.__end(body, VS.DEAD)
+                    print("ENV: " + body.mind.NAME +
+                          ": time limit reached, no batt, it is dead")
+                elif not more_actions_to_do:  # agent do not have more actions to do
+                    if body._at_base():
+                        print("ENV: ag " + body.mind.NAME +
+                              " succesfully terminated, it is at the base")
+                        self.__end(body, VS.ENDED)
+
+                    else:
+                        print("ENV: ag " + body.mind.NAME +
+                              " is not at the base and asked for termination. Now, it's dead")
+                        self.__end(body, VS.DEAD)
+
+            elif body._state == VS.IDLE:
+                active_or_idle = True
+
+        self.cycle += 1
+
+        # the simulation ends when there is no more active or idle agents
+        self.done = not active_or_idle
+
+        # or when every agent is waiting or idle: no one is left to wake them up
+        if active_or_idle and not deliberated:
+            print("ENV: every agent is waiting or idle, no one can wake them up")
+            self.done = True
+
+        return self.get_observations()
+
+    def fast_forward(self):
+        """ This public method advances the simulation while every ACTIVE agent follows a declared
+        plan (see AbstAgent.declare_plan). Each cycle executes the next planned route of each agent,
+        as its deliberate would, without calling deliberate, handling events or drawing. It stops
+        after the cycle in which the plan of an agent ends, a step fails or an agent runs out of
+        time. It is called by run; step always advances exactly one cycle.
+        @return: the number of cycles advanced (0 when some active agent has no plan)"""
+
+        bodies = [body for body in self.agents
+                  if body._state == VS.ACTIVE and body._waiting is None]
+        cycles = 0
+
+        while bodies and all(body._plan for body in bodies):
+            for body in bodies:
+                body._plan_step()
+                if body._end_of_time():
+                    self.__end(body, VS.DEAD)
+                    print("ENV: " + body.mind.NAME +
+                          ": time limit reached, no batt, it is dead")
+
+            self.cycle += 1
+            cycles += 1
+            if any(body._state != VS.ACTIVE for body in bodies):
+                break
+
+        return cycles
+
+    def get_observations(self):
+        """ Public method for getting the current state of the simulation
+        @return: a dictionary with
+        - x, y: arrays with the position of each agent (in the order they were added)
+        - rtime: array with the remaining time of each agent
+        - state: array with the state of each agent (VS.ACTIVE, VS.IDLE, VS.ENDED, VS.DEAD)
+        - found, saved: arrays with the number of victims found and saved by each agent
+        - cycle: the number of executed cycles
+        - done: True when there is no more active or idle agents"""
+
+        return {
+            "x": np.array([body.x for body in self.agents], dtype=np.int32),
+            "y": np.array([body.y for body in self.agents], dtype=np.int32),
+            "rtime": np.array([body._rtime for body in self.agents], dtype=np.float64),
+            "state": np.array([body._state for body in self.agents], dtype=np.int8),
+            "found": np.array([len(body.found_stats) for body in self.agents], dtype=np.int32),
+            "saved": np.array([len(body.saved_stats) for body in self.agents], dtype=np.int32),
+            "cycle": self.cycle,
+            "done": self.done,
+        }
 
     def run(self):
-        """ This public method is the engine of the simulator. It calls the deliberate
-        method of each ACTIVE agent situated in the environment. Then, it updates the state
-        of the agents and of the environment"""
+        """ This public method is the engine of the simulator. It executes the cycles of the
+        simulation (see step) until there is no more active or idle agents, drawing the
+        environment after each cycle. While every active agent follows a declared plan, the
+        cycles are run by fast_forward instead.
+        In headless mode, pygame is not used at all, there is no delay between the cycles
+        and the simulator does not wait for the user at the end of the execution.
+        @return: a dictionary with the accumulated results (see get_acum_results)"""
+
+        if not self.headless:
+            if pygame is None:
+                print("ENV: pygame is not installed, use the headless mode")
+                exit()
 
-        cycle = 0
-        # Set up Pygame
-        pygame.init()
+            # Set up Pygame
+            pygame.init()
 
-        # Create the font object
-        self.font = pygame.font.SysFont(None, 24)
+            # Create the font object
+            self.font = pygame.font.SysFont(None, 24)
 
-        # Create the window
-        self.screen = pygame.display.set_mode(
-            (self.dic["WINDOW_WIDTH"], self.dic["WINDOW_HEIGHT"]))
+            # Create the window
+            self.screen = pygame.display.set_mode(
+                (self.dic["WINDOW_WIDTH"], self.dic["WINDOW_HEIGHT"]))
 
-        # Draw the environment with items
-        self.__draw()
+            # Draw the environment with items
+            self.__draw(full=True)
 
         # Create the main loop
         running = True
 
         while running:
             # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-            # control whether or not there are active or idle agents
-            active_or_idle = False
-
-            # ask each agent to deliberate the next action
-            for body in self.agents:
-
-                # Asks the agent to choose and to do the next action if it is ACTIVE
-                if body._state == VS.ACTIVE:
-                    active_or_idle = True
-                    more_actions_to_do = body.mind.deliberate()
-
-                    # if cycle % 50 == 0:
-                    #    print(f"ENV: cycle {cycle} {body.mind.NAME} remaining: {body.rtime}")
-
-                    # Test if the agent exceeded the time limit
-                    if body._end_of_time():
-                        body._state = VS.DEAD
-                        print("ENV: " + body.mind.NAME +
-                              ": time limit reached, no batt, it is dead")
-                    elif not more_actions_to_do:  # agent do not have more actions to do
-                        if body._at_base():
-                            print("ENV: ag " + body.mind.NAME +
-                                  " succesfully terminated, it is at the base")
-                            body._state = VS.ENDED
-
-                        else:
-                            print("ENV: ag " + body.mind.NAME +
-                                  " is not at the base and asked for termination. Now, it's dead")
-                            body._state = VS.DEAD
-
-                elif body._state == VS.IDLE:
-                    active_or_idle = True
-
-            # Update the grid after the delay
-            if self.dic["DELAY"] > 0:
-                time.sleep(self.dic["DELAY"])
-
-            self.__draw()
-
-            cycle += 1
+            if not self.headless:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+                    elif event.type == pygame.VIDEOEXPOSE:
+                        self.__draw(full=True)
+
+            # while every active agent follows a plan, no need to ask them
+            if self.fast_forward() > 0:
+                self.done = False   # there were active agents, as in a regular cycle
+            else:
+                self.step()
+
+            if not self.headless:
+                # Update the grid after the delay
+                if self.dic["DELAY"] > 0:
+                    time.sleep(self.dic["DELAY"])
+
+                self.__draw()
 
             # Show metrics when there is no more active or idle agents
-            if not active_or_idle:
+            if self.done:
                 print(
                     "ENV: no active or idle agent scheduled for execution... terminating")
                 if self.dic["STATS_PER_AG"] == 1:
@@ -391,66 +712,55 @@ class Env:
                     print("\n--------------")
                     self.print_acum_results()
 
-                input("ENV: Tecle qualquer coisa para encerrar >>")
+                if not self.headless:
+                    input("ENV: Tecle qualquer coisa para encerrar >>")
                 running = False
 
         # Quit Pygame
-        pygame.quit()
+        if not self.headless:
+            pygame.quit()
 
-    def __print_victims(self, victims, type_str, sub, ident=3):
-        """ Print either the found or the saved victims list
-        @param victims: it is the list to be printed
+        return self.get_acum_results()
+
+    def __print_victims(self, stats, type_str, sub, ident=3):
+        """ Print either the found or the saved victims
+        @param stats: it is the VictimStats of the victims to be printed
         @param type_str: it is a string for composing the pring
         @param sub: it is a character representing the metric"""
 
         idents = ' ' * ident
 
-        if len(victims) > 0:
-            sev_label = []
-            sev_value = []
-            tot_sev = 0        # for peg or psg calculation
-            for v in victims:
-                sev_label.append(self.sev_label[v])
-                sev_value.append(self.sev_value[v])
-                tot_sev = tot_sev + self.sev_value[v]
-
+        if len(stats) > 0:
             print(f"\n{idents}{type_str} victims: (ID, Sev label, Sev value)")
-            for i in range(len(victims)):
-                print(f"{idents}({victims[i]:d}, {sev_label[i]:d}, {
-                      sev_value[i]:.1f})", end=' ')
+            for v in sorted(stats.victims):
+                print(f"{idents}({v:d}, {self.sev_label[v]:d}, {
+                      self.sev_value[v]:.1f})", end=' ')
 
             print("\n")
-            if self.sev_label.count(1) > 0:
-                print(f"{idents}Critical victims {type_str}     (V{sub}1) = {sev_label.count(1):3d} out of {
-                      self.sev_label.count(1)} ({100*sev_label.count(1)/self.sev_label.count(1):.1f})%")
-            if self.sev_label.count(2) > 0:
-                print(f"{idents}Instable victims {type_str}     (V{sub}2) = {sev_label.count(2):3d} out of {
-                      self.sev_label.count(2)} ({100*sev_label.count(2)/self.sev_label.count(2):.1f})%")
-            if self.sev_label.count(3) > 0:
-                print(f"{idents}Pot. inst. victims {type_str}   (V{sub}3) = {sev_label.count(3):3d} out of {
-                      self.sev_label.count(3)} ({100*sev.count(3)/self.sev_label.count(3):.1f})%")
-            if self.sev_label.count(4) > 0:
-                print(f"{idents}Stable victims {type_str}       (V{sub}4) = {sev_label.count(4):3d} out of {
-                      self.sev_label.count(4)} ({100*sev_label.count(4)/self.sev_label.count(4):.1f})%")
+            names = ["Critical victims", "Instable victims", "Pot. inst. victims", "Stable victims"]
+            for i in range(4):
+                if self.sev_count[i] > 0:
+                    label = f"{names[i]} {type_str}"
+                    print(f"{idents}{label:<27}(V{sub}{i+1}) = {stats.per_sev[i]:3d} out of {
+                          self.sev_count[i]} ({100*stats.per_sev[i]/self.sev_count[i]:.1f})%")
             print(f"{idents}--------------------------------------")
             print(f"{idents}Total of {type_str} victims     (V{sub})  = {
-                  len(sev_label):3d} ({100*float(len(sev_label)/self.nb_of_victims):.2f}%)")
+                  len(stats):3d} ({100*float(len(stats)/self.nb_of_victims):.2f}%)")
 
-            weighted = ((6*sev_label.count(1) + 3*sev_label.count(2) + 2*sev_label.count(3) + sev_label.count(4)) /
-                        (6*self.sev_label.count(1)+3*self.sev_label.count(2)+2*self.sev_label.count(3)+self.sev_label.count(4)))
+            weighted = stats.weighted(self.sev_count)
 
             print(f"{idents}Weighted {
                   type_str} victims per sev_label (V{sub}g) = {weighted:.2f}\n")
 
             print(f"{idents}Sum of gravities of all {type_str} victims = {
-                  tot_sev:.2f} of a total of {self.sum_gravity:.2f}")
+                  stats.sum_gravity:.2f} of a total of {self.sum_gravity:.2f}")
             print(f"{idents}  % of gravities of all {
-                  type_str} victims = {tot_sev/self.sum_gravity:.2f}")
+                  type_str} victims = {stats.sum_gravity/self.sum_gravity:.2f}")
             print(f"{idents}--------------------------------------")
             print(f"{idents}CSV of {type_str} victims")
             print(f"{idents}V{sub}1,V{sub}2,V{sub}3,V{sub}4,V{sub}g")
-            print(f"{idents}{sev_label.count(1)},{sev_label.count(2)},{
-                  sev_label.count(3)},{sev_label.count(4)},{weighted}")
+            print(f"{idents}{stats.per_sev[0]},{stats.per_sev[1]},{
+                  stats.per_sev[2]},{stats.per_sev[3]},{weighted}")
         else:
             print(f"{idents}No {type_str} victims")
             print(f"{idents}--------------------------------------")
@@ -474,12 +784,54 @@ class Env:
             print(f"{body.mind.TLIM - body._rtime:.2f} of {body.mind.TLIM:.2f}")
 
             # Found victims
-            found = body._get_found_victims()
-            self.__print_victims(found, "found", "e", ident=5)
+            self.__print_victims(body.found_stats, "found", "e", ident=5)
 
             # Saved victims
-            saved = body._get_saved_victims()
-            self.__print_victims(saved, "saved", "s", ident=5)
+            self.__print_victims(body.saved_stats, "saved", "s", ident=5)
+
+    def __count_victims(self, stats, sub):
+        """ Count the victims of a registry per severity label
+        @param stats: the VictimStats of the victims
+        @param sub: a character representing the metric ('e' found, 's' saved)
+        @return: a dictionary {V<sub>1, ..., V<sub>4, V<sub>g} as in the CSV of the stats"""
+
+        counts = {f"V{sub}{i+1}": stats.per_sev[i] for i in range(4)}
+        counts[f"V{sub}g"] = stats.weighted(self.sev_count)
+        return counts
+
+    def get_results(self):
+        """ Public method for getting the found and saved victims by severity per agent.
+        The counters are updated along the simulation, so it may be called at any time.
+        @return: a list with a dictionary per agent (in the order they were added) with the keys
+        - NAME, STATE and CONSUMED (consumed time)
+        - Ve1, Ve2, Ve3, Ve4, Veg: found victims per severity and the weighted metric
+        - Vs1, Vs2, Vs3, Vs4, Vsg: saved victims per severity and the weighted metric"""
+
+        results = []
+        for body in self.agents:
+            agent = {"NAME": body.mind.NAME, "STATE": body._state,
+                     "CONSUMED": body.mind.TLIM - body._rtime}
+            agent.update(self.__count_victims(body.found_stats, "e"))
+            agent.update(self.__count_victims(body.saved_stats, "s"))
+            results.append(agent)
+
+        return results
+
+    def get_acum_results(self):
+        """ Public method for getting the found and saved victims by severity for all agents.
+        It is the same data printed in the CSV lines of print_acum_results.
+        The counters are updated along the simulation, so it may be called at any time.
+        @return: a dictionary with the keys
+        - V1, V2, V3, V4, SG: the number of victims per severity and the sum of gravities
+        - Ve1, Ve2, Ve3, Ve4, Veg: found victims per severity and the weighted metric
+        - Vs1, Vs2, Vs3, Vs4, Vsg: saved victims per severity and the weighted metric"""
+
+        results = {f"V{i+1}": self.sev_count[i] for i in range(4)}
+        results["SG"] = self.sum_gravity
+        results.update(self.__count_victims(self.found_stats, "e"))
+        results.update(self.__count_victims(self.saved_stats, "s"))
+
+        return results
 
     def print_acum_results(self):
         """ Print found victims and saved victims by sev_label for all agents.
@@ -487,32 +839,24 @@ class Env:
 
         print("\n\n*** ACUMULATED RESULTS - FOR ALL AGENTS ***\n")
         print(f" *** Numbers of Victims in the Environment ***")
-        print(f"   Critical victims   (V1) = {self.sev_label.count(1):3d}")
-        print(f"   Instable victims   (V2) = {self.sev_label.count(2):3d}")
-        print(f"   Pot. inst. victims (V3) = {self.sev_label.count(3):3d}")
-        print(f"   Stable victims     (V4) = {self.sev_label.count(4):3d}")
+        print(f"   Critical victims   (V1) = {self.sev_count[0]:3d}")
+        print(f"   Instable victims   (V2) = {self.sev_count[1]:3d}")
+        print(f"   Pot. inst. victims (V3) = {self.sev_count[2]:3d}")
+        print(f"   Stable victims     (V4) = {self.sev_count[3]:3d}")
         print(f"   --------------------------------------")
         print(f"   Total of victims   (V)  = {self.nb_of_victims:3d}")
         print(f"   Sum of all gravities(SG) = {self.sum_gravity:.2f}")
         print(f"   --------------------------------------")
         print(f"   CSV of nb. total of victims")
         print(f"   V1,V2,V3,V4,SG")
-        print(f"   {self.sev_label.count(1)},{self.sev_label.count(2)},{
-              self.sev_label.count(3)},{self.sev_label.count(4)},{self.sum_gravity}")
+        print(f"   {self.sev_count[0]},{self.sev_count[1]},{
+              self.sev_count[2]},{self.sev_count[3]},{self.sum_gravity}")
 
-        found = []
-        for index, agents in enumerate(self.found, start=0):
-            if agents:
-                found.append(index)
         print(f"")
         print(f" *** FOUND victims by all explorer agents ***")
-        self.__print_victims(found, "found", "e", ident=5)
+        self.__print_victims(self.found_stats, "found", "e", ident=5)
 
-        saved = []
-        for index, agents in enumerate(self.saved, start=0):
-            if agents:
-                saved.append(index)
         print(f"")
         print(f" *** SAVED victims by all rescuer agents ***")
-        self.__print_victims(saved, "saved", "s", ident=5)
+        self.__print_victims(self.saved_stats, "saved", "s", ident=5)
         print(f"\n *** END OF STATS ***")
@@ -0,0 +1,125 @@
+## exp_runner
+##
+## Runs an experiment: several independent runs of VictimSim2 with the same
+## dataset, in parallel (one headless simulation per process), and writes the
+## descriptor and results files read by tools/results/exp_plot_results.py.
+##
+## Usage: python exp_runner.py <data folder> [-n runs] [-j processes] [-s seed] [-o output folder]
+##        python exp_runner.py datasets/data_225v_100x80 -n 30
+##
+## Each run i is seeded with seed + i, so an experiment can be reproduced.
+##
+## Output (for the dataset data_225v_100x80):
+##  exp_225v_100x80_descriptor.txt: V1,V2,V3,V4,SG    # nb of victims per severity and sum of gravities
+##  exp_225v_100x80_results.txt: Ve1,Ve2,Ve3,Ve4,Veg,Vs1,Vs2,Vs3,Vs4,Vsg   # one row per run
+##
+## A run that raises an exception is left out of the results; its seed is reported.
+
+import os
+import io
+import csv
+import random
+import argparse
+import contextlib
+import traceback
+from multiprocessing import Pool
+import numpy as np
+
+import main
+
+DESCRIPTOR_FIELDS = ["V1", "V2", "V3", "V4", "SG"]
+RESULTS_FIELDS = ["Ve1", "Ve2", "Ve3", "Ve4", "Veg", "Vs1", "Vs2", "Vs3", "Vs4", "Vsg"]
+
+
+def run_once(args):
+    """ Runs one headless simulation
+    @param args: a pair (data folder, seed)
+    @return: a pair (results, error): the accumulated results of the environment (see
+    Env.get_acum_results) and None, or None and the traceback of the run that failed"""
+
+    data_folder, seed = args
+    random.seed(seed)
+    np.random.seed(seed)
+
+    # the agents print every step: keep the terminal clean; the runs share the simulator
+    # folder, so they do not write the predictions and clusters files there
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return main.main(data_folder, headless=True, output_folder=None), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def run_experiment(data_folder, runs, processes=None, seed=0):
+    """ Runs the simulation several times in a pool of processes
+    @param data_folder: the folder of the dataset
+    @param runs: the number of runs
+    @param processes: the number of processes (None = number of cpus)
+    @param seed: the seed of the first run; the run i uses seed + i
+    @return: a pair (results, failed): a list with the results of the successful runs, in
+    the order of the seeds, and a list of pairs (seed, traceback) of the failed runs"""
+
+    data_folder = os.path.abspath(data_folder)
+    tasks = [(data_folder, seed + i) for i in range(runs)]
+
+    with Pool(processes) as pool:
+        outcomes = pool.map(run_once, tasks, chunksize=1)
+
+    results = [result for result, error in outcomes if error is None]
+    failed = [(task[1], error) for task, (result, error) in zip(tasks, outcomes) if error is not None]
+    return results, failed
+
+
+def write_experiment(results, output_folder, name):
+    """ Writes the descriptor and the results files of an experiment
+    @param results: a list with the results of each run
+    @param output_folder: the folder for the files
+    @param name: the name of the experiment, e.g., 225v_100x80
+    @return: the paths of the descriptor and of the results files"""
+
+    os.makedirs(output_folder, exist_ok=True)
+    descriptor_file = os.path.join(output_folder, f"exp_{name}_descriptor.txt")
+    results_file = os.path.join(output_folder, f"exp_{name}_results.txt")
+
+    with open(descriptor_file, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(DESCRIPTOR_FIELDS)
+        writer.writerow([results[0][field] for field in DESCRIPTOR_FIELDS])
+
+    with open(results_file, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(RESULTS_FIELDS)
+        for run in results:
+            writer.writerow([run[field] for field in RESULTS_FIELDS])
+
+    return descriptor_file, results_file
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs several headless simulations of a dataset")
+    parser.add_argument("data_folder", help="folder of the dataset, e.g., datasets/data_225v_100x80")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="number of runs")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="number of processes (default: nb of cpus)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("-o", "--output", default=".", help="folder for the descriptor and results files")
+    args = parser.parse_args()
+
+    # data_225v_100x80 -> 225v_100x80
+    name = os.path.basename(os.path.normpath(args.data_folder))
+    if name.startswith("data_"):
+        name = name[len("data_"):]
+
+    results, failed = run_experiment(args.data_folder, args.runs, args.processes, args.seed)
+    for seed, error in failed:
+        print(f"Run with seed {seed} failed:\n{error}")
+    if not results:
+        print("No run succeeded, no file written")
+        raise SystemExit(1)
+
+    descriptor_file, results_file = write_experiment(results, args.output, name)
+
+    print(f"{len(results)} of {args.runs} runs of {args.data_folder}")
+    if failed:
+        print(f"Failed seeds: {', '.join(str(seed) for seed, _ in failed)}")
+    print(f"Descriptor: {descriptor_file}")
+    print(f"Results:    {results_file}")
@@ -1,21 +1,30 @@
 # EXPLORER AGENT
 # @Author: Tacla, UTFPR
 #
-# It walks randomly in the environment looking for victims. When half of the
-# exploration has gone, the explorer goes back to the base.
-
-from collections import deque
-import heapq
-from queue import PriorityQueue
-import sys
-import os
-import random
+# It walks in the environment looking for victims. It keeps the cost to walk back
+# to the base from every known cell (a CostField) and goes back, by the least-cost
+# known path, when it cannot afford one more step.
+#
+# There are two exploration modes:
+# - "dfs": a depth-first search that walks back, one cell per cycle, to the last
+#   position with an unvisited neighbour
+# - "frontier": the explorer steps into an unknown neighbour while there is one;
+#   otherwise it walks by the least-cost known path to a frontier cell (a known cell
+#   with unknown neighbours). The frontier cells are scored by their path cost plus
+#   a penalty for lying, as seen from the base, in a direction the explorer does
+#   not prefer.
+#
+# Explorers given the same Blackboard share their map, frontier, cost field and
+# found victims, and claim the frontier cells they head to. If the blackboard has
+# an ExplorerManager, the explorers head to the targets it assigns.
+
 import math
-from abc import ABC, abstractmethod
 from abstract_agent import AbstAgent
-from rescuer import Rescuer
 from constants import VS
 from map import Map
+from cost_field import CostField
+from frontier import Frontier
+import search
 
 
 class Stack:
@@ -34,11 +43,26 @@ class Stack:
 
 
 class Explorer(AbstAgent):
-    def __init__(self, env, config_file, resc, path_priorities):
+    MODES = ("dfs", "frontier")
+
+    # penalty, in COST_LINE units, for each position of a frontier direction in the
+    # explorer's path priorities
+    DIRECTION_WEIGHT = 2
+
+    # cycles between two reports to the rescuer manager
+    REPORT_PERIOD = 10
+
+    # directions of the 8 sectors around the base, counterclockwise from the x axis
+    SECTORS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+
+    def __init__(self, env, config_file, resc, path_priorities, mode="dfs", blackboard=None):
         """ Construtor do agente random on-line
         @param env: a reference to the environment 
         @param config_file: the absolute path to the explorer's config file
         @param resc: a reference to the rescuer agent to invoke when exploration finishes
+        @param path_priorities: the directions, by name, in the order the explorer prefers
+        @param mode: the exploration mode, one of Explorer.MODES
+        @param blackboard: an optional Blackboard shared with other explorers
         """
 
         super().__init__(env, config_file)
@@ -49,31 +73,58 @@ class Explorer(AbstAgent):
         self.y = 0                 # current y position relative to the origin 0
         # set the time to come back to the base
         self.time_to_comeback = math.ceil(self.TLIM * 0.6)
-        # create a map for representing the environment
-        self.map = Map(path_priorities)
+        self.blackboard = blackboard
+        if blackboard is None:
+            # the cost to come back to the base from each known cell
+            self.cost_field = CostField(self.COST_LINE, self.COST_DIAG)
+            # the known cells with unknown neighbours
+            self.frontier = Frontier()
+            # create a map for representing the environment
+            self.map = Map(path_priorities, self.cost_field, self.frontier)
+        else:
+            blackboard.join(self, path_priorities)
+            self.cost_field = blackboard.cost_field
+            self.frontier = blackboard.frontier
+            self.map = blackboard.map
+        if mode not in Explorer.MODES:
+            raise ValueError(f"unknown exploration mode: {mode}")
+        self.mode = mode
+        # the rank of each direction in the path priorities (first occurrence)
+        self.priority_rank = {}
+        for rank, name in enumerate(path_priorities):
+            self.priority_rank.setdefault(Explorer.AC_INCR[name], rank)
+        self.frontier_path = []     # the way to the chosen frontier cell
         # a dictionary of found victims: (seq): ((x,y), [<vs>])
-        self.victims = {}
+        self.victims = {} if blackboard is None else blackboard.victims
         # the key is the seq number of the victim,(x,y) the position, <vs> the list of vital signals
+        # the victims this explorer came across, read by itself or by another explorer
+        # of the blackboard, for its own stats: (seq): ((x,y), [<vs>])
+        self.found_victims = {}
 
         # put the current position - the base - in the map
-        self.map.add((self.x, self.y), 1, VS.NO_VICTIM,
-                     self.check_walls_and_lim())
+        self.map.add((self.x, self.y), 1, VS.NO_VICTIM, self.sense()[0])
 
         # self.set_known_map = []
-        self.map_graph = {}
-        self.known_map = []
-        self.known_victims = []
+        self.known_cells = set()    # the visited positions, for membership tests
+        self.known_map = []         # the visited positions [x, y] in visiting order
+        self.known_victims = [] if blackboard is None else blackboard.known_victims
         self.resc = resc
         self.last_position = ''
         self.visited_position = set()
         # Define a pilha de posições visitadas
         self.position_stack = []
         self.path = []
+        self.coming_back = False
+        # what was already reported to the rescuer manager (lengths of known_map and
+        # known_victims) and the cycles since the last report
+        self.cells_reported = 0
+        self.victims_reported = 0
+        self.cycles_unreported = 0
 
     def get_next_position(self, direction):
         """ Gets the next position that can be explored (no wall and inside the grid). """
         # Verifica as direções possíveis para se mover a partir da posição atual
-        obstacles = self.check_walls_and_lim()
+        obstacles, _ = self.sense()
 
         # Lista de direções possíveis
         directions = list(range(8))
@@ -106,24 +157,81 @@ class Explorer(AbstAgent):
         # Se todas as direções levarem a posições conhecidas, retorna 0, 0 (ficar parado)
         return dx, dy
 
+    def get_frontier_move(self):
+        """ Gets the next move of the frontier mode: a step into an unknown neighbour
+        or, if there is none, the next step on the way to the best frontier cell
+        @return: (dx, dy), or (0, 0) if there is nothing left to explore """
+        here = (self.x, self.y)
+        unknown = [search.NEIGHBOURS[i]
+                   for i in self.frontier.unknown_directions(here)]
+        if unknown:
+            self.frontier_path = []
+            self.release_frontier()
+            return min(unknown, key=lambda d: self.priority_rank.get(d, len(Explorer.SECTORS)))
+
+        if self.blackboard is not None and self.blackboard.manager is not None:
+            target = self.blackboard.manager.target_for(self)
+            if target is not None and (not self.frontier_path or self.frontier_path[-1] != target):
+                path = search.astar(self.map, here, target, self.COST_LINE, self.COST_DIAG)
+                self.frontier_path = path[1:] if path else []
+
+        if not self.frontier_path or self.frontier_path[-1] not in self.frontier:
+            path = None
+            if self.blackboard is not None:
+                path = search.best_target(self.map, here, self.blackboard.free_frontier(self),
+                                          self.frontier_bias, self.COST_LINE, self.COST_DIAG)
+                if path is not None:
+                    self.blackboard.claim(path[-1], self)
+            if path is None:
+                # alone, or every frontier cell is claimed: head to the best one anyway
+                self.release_frontier()
+                path = search.best_target(self.map, here, self.frontier, self.frontier_bias,
+                                          self.COST_LINE, self.COST_DIAG)
+            if path is None:
+                return 0, 0
+            self.frontier_path = path[1:]
+
+        next_x, next_y = self.frontier_path.pop(0)
+        return next_x - self.x, next_y - self.y
+
+    def release_frontier(self):
+        """ Releases the frontier cell claimed in the blackboard, if any """
+        if self.blackboard is not None:
+            self.blackboard.release(self)
+
+    def frontier_bias(self, coord):
+        """ The penalty of a frontier cell for the direction it lies from the base
+        @param coord: a pair (x, y)
+        @return: a cost in the same unit as the walk actions """
+        if coord == (0, 0):
+            return 0
+        sector = round(math.atan2(coord[1], coord[0]) / (math.pi / 4)) % 8
+        rank = self.priority_rank.get(Explorer.SECTORS[sector], len(Explorer.SECTORS))
+        return rank * Explorer.DIRECTION_WEIGHT * self.COST_LINE
+
     def explore(self):
+        """ Walks to the next position to explore
+        @return: False if there is nothing left to explore, True otherwise """
         # Check the neighborhood obstacles
-        obstacles = self.check_walls_and_lim()
+        obstacles, _ = self.sense()
 
         # get an random increment for x and y
         # mov = self.map.get_action()
         # dy = mov[0]
         # dx = mov[1]
 
-        dx, dy = self.get_next_position(self.map.path_priorities)
+        if self.mode == "frontier":
+            dx, dy = self.get_frontier_move()
+        else:
+            dx, dy = self.get_next_position(self.map.path_priorities)
+        if dx == 0 and dy == 0:
+            return False
 
         # while not self.authorize(obstacles, dx, dy):
         #     mov = self.map.get_action()
         #     dy = mov[0]
         #     dx = mov[1]
 
-        self.update_known_map()
-
         # Moves the body to another position
         rtime_bef = self.get_rtime()
         result = self.walk(dx, dy)
@@ -136,7 +244,7 @@ class Explorer(AbstAgent):
         if result == VS.BUMPED:
             # update the map with the wall
             self.map.add((self.x + dx, self.y + dy), VS.OBST_WALL,
-                         VS.NO_VICTIM, self.check_walls_and_lim())
+                         VS.NO_VICTIM, obstacles)
             # print(f"""{self.NAME}: Wall or grid limit reached at ({
             #       self.x + dx}, {self.y + dy})""")
 
@@ -149,15 +257,17 @@ class Explorer(AbstAgent):
             self.x += dx
             self.y += dy
 
-            # Check for victims
-            seq = self.check_for_victim()
-            if seq != VS.NO_VICTIM:
+            # Check the new position: its obstacles and victim
+            obstacles, seq = self.sense()
+            if seq != VS.NO_VICTIM and seq not in self.victims:
                 vs = self.read_vital_signals()
                 self.victims[vs[0]] = ((self.x, self.y), vs)
                 print(f"""{self.NAME} Victim found at ({self.x}, {
                       self.y}), rtime: {self.get_rtime()}""")
                 self.known_victims.append(((self.x, self.y), vs))
                 # print(f"{self.NAME} Seq: {seq} Vital signals: {vs}")
+            if seq != VS.NO_VICTIM:
+                self.found_victims.setdefault(seq, self.victims[seq])
 
             # Calculates the difficulty of the visited cell
             difficulty = (rtime_bef - rtime_aft)
@@ -167,55 +277,47 @@ class Explorer(AbstAgent):
                 difficulty = difficulty / self.COST_DIAG
 
             # Update the map with the new cell
-            self.map.add((self.x, self.y), difficulty,
-                         seq, self.check_walls_and_lim())
+            self.map.add((self.x, self.y), difficulty, seq, obstacles)
             print(f"""{self.NAME}:at ({self.x}, {self.y}), diffic: {
                   difficulty:.2f} vict: {seq} rtime: {self.get_rtime()}""")
 
-        return
+        return True
 
     def at_base(self):
         return self.x == 0 and self.y == 0
 
+    def can_afford_step(self):
+        """ Checks if the explorer can walk one more step and still come back to the
+        base. The next cell may be unknown, so the step is priced as a diagonal one
+        into the hardest cell seen so far, plus reading a victim there, and the way
+        back goes through the current cell.
+        @return: True if the remaining time covers the step and the way back """
+        step = max(self.COST_LINE, self.COST_DIAG)
+        here = self.map.get((self.x, self.y))[0]
+        go = step * self.cost_field.max_difficulty + self.COST_READ
+        back = step * here + self.cost_field.cost((self.x, self.y))
+        return go + back < self.get_rtime()
+
     def update_known_map(self):
-        if [self.x, self.y] not in self.known_map:
+        """ Records the current position as visited """
+        coord = (self.x, self.y)
+        if coord not in self.known_cells:
+            self.known_cells.add(coord)
             self.known_map.append([self.x, self.y])
-            discovered = (self.x, self.y)
-            self.map_graph[discovered] = []
-            for coord in self.map_graph.keys():
-                cost = self.is_neighbour(discovered, coord)
-                if cost != None:
-                    self.map_graph[discovered].append([coord, cost])
-                    self.map_graph[coord].append([discovered, cost])
-
-    def is_neighbour(self, coord1, coord2):
-        if (coord1[0] - 1, coord1[1]) == coord2:
-            return self.COST_LINE
-        if (coord1[0], coord1[1] - 1) == coord2:
-            return self.COST_LINE
-        if (coord1[0] - 1, coord1[1] - 1) == coord2:
-            return self.COST_DIAG
-        if (coord1[0] + 1, coord1[1]) == coord2:
-            return self.COST_LINE
-        if (coord1[0], coord1[1] + 1) == coord2:
-            return self.COST_LINE
-        if (coord1[0] + 1, coord1[1] + 1) == coord2:
-            return self.COST_DIAG
-        if (coord1[0] + 1, coord1[1] - 1) == coord2:
-            return self.COST_DIAG
-        if (coord1[0] - 1, coord1[1] + 1) == coord2:
-            return self.COST_DIAG
-        return None
-
-    def come_back(self, position):
-        print(position)
-        if position is not None:
-            dx = position[0] - self.x
-            dy = position[1] - self.y
-            # self.walk_stack.push((dx, dy))
-            self.x += dx
-            self.y += dy
-            self.walk(dx, dy)
+
+    def come_back(self, path):
+        """ Walks the path in a single follow_path action
+        @param path: the positions to walk to, or None """
+        print(path)
+        if path:
+            moves = []
+            x, y = self.x, self.y
+            for position in path:
+                moves.append((position[0] - x, position[1] - y))
+                x, y = position
+            result, steps = self.follow_path(moves)
+            if steps > 0:
+                self.x, self.y = path[steps - 1]
             print(f"Agente movido para posição: ({self.x}, {
                 self.y}) Tempo: {self.get_rtime()}")
             if (self.at_base()):
@@ -225,53 +327,15 @@ class Explorer(AbstAgent):
             print("Não foi possível encontrar um caminho para a base.")
             return
 
-    def heuristic(self, a, b):
-        return math.sqrt((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2)
-
-    def astar(self, map_instance, start, goal):
-        open_set = PriorityQueue()
-        open_set.put(start, 0)
-        came_from = {}
-        g_score = {position: float('inf')
-                   for position in map_instance.map_data.keys()}
-        g_score[start] = 0
-        f_score = {position: float('inf')
-                   for position in map_instance.map_data.keys()}
-        f_score[start] = self.heuristic(start, goal)
-
-        while not open_set.empty():
-            current = open_set.get()
-
-            if current == goal:
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.append(start)
-                print(f"""Caminho A*: {path[::-1]}""")
-                return path[::-1]
-
-            for neighbor in self.get_neighbors(map_instance, current):
-                # Assuming each move costs 1
-                tentative_g_score = g_score[current] + 1
-
-                if tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + \
-                        self.heuristic(neighbor, goal)
-                    if neighbor not in open_set.queue:
-                        open_set.put(neighbor, f_score[neighbor])
-
-        return None  # No path found
-
-    def get_neighbors(self, map_instance, position):
-        neighbors = []
-        for action, (dx, dy) in map_instance.coordinates_map.items():
-            new_x, new_y = position[0] + dx, position[1] + dy
-            if map_instance.is_position_known(new_x, new_y):
-                neighbors.append((new_x, new_y))
-        return neighbors
+    def report(self, final=False):
+        """ Sends to the rescuer manager the positions and victims found since the last report
+        @param final: True when the exploration is over """
+        cells = self.known_map[self.cells_reported:]
+        victims = self.known_victims[self.victims_reported:]
+        self.cells_reported = len(self.known_map)
+        self.victims_reported = len(self.known_victims)
+        self.cycles_unreported = 0
+        self.resc.report(self, cells, victims, final)
 
     def deliberate(self) -> bool:
         """ The agent chooses the next action. The simulator calls this
@@ -279,31 +343,36 @@ class Explorer(AbstAgent):
 
         self.update_known_map()  # atualizar o mapa que já é conhecido
 
-        consumed_time = self.TLIM - self.get_rtime()
-        if consumed_time < self.get_rtime():
-            self.explore()
-            return True
+        if not self.coming_back:
+            self.cycles_unreported += 1
+            if self.cycles_unreported >= Explorer.REPORT_PERIOD:
+                self.report()
+            if self.can_afford_step() and self.explore():
+                return True
+            self.coming_back = True
+            self.release_frontier()
+            # nothing new is found on the way back: the rescuers need not wait for it
+            self.report(final=True)
 
         # time to come back to the base
-        if not self.position_stack or (self.x == 0 and self.y == 0):
+        if self.at_base():
             # time to wake up the rescuer
             # pass the walls and the victims (here, they're empty)
             print(f"""{self.NAME}: rtime {
                 self.get_rtime()}, chegou na base""")
+            print(f"""{self.NAME}: {len(self.found_victims)} victims found""")
             # input(f"{self.NAME}: type [ENTER] to proceed")
 
-            if self.at_base:
-                self.resc.combine_maps(self.known_map, self.known_victims)
-                self.resc.set_state(VS.ACTIVE)
-                # self.resc.go_save_victims(self.map, self.victims)
+            # the final report was sent when coming back started
+            # self.resc.go_save_victims(self.map, self.victims)
             return False
         else:
-            base_position = (0, 0)
             if not self.path:
-                self.path = self.astar(
-                    self.map, (self.x, self.y), base_position)
+                # the least-cost path is already known by the cost field
+                self.path = self.cost_field.path_to_base((self.x, self.y))
                 print(f"""caminho encontrado {self.path}""")
-            self.come_back(self.path.pop(0))
+            self.come_back(self.path)
+            self.path = []
             return True
 
     def authorize(self, obstacles, x, y):
@@ -0,0 +1,120 @@
+# Explorer manager
+#
+# Coordinates the explorers of a Blackboard in the frontier mode. Every PERIOD
+# cycles, or sooner when the target of an explorer stops being a frontier cell,
+# it groups the frontier into clusters of neighbouring cells and solves the
+# assignment problem between the active explorers and the clusters. The cost of
+# a cluster for an explorer is the least known path cost from the explorer to the
+# cluster. Each explorer gets the nearest cell of its cluster as target, claimed
+# in the blackboard; explorers left without a cluster choose their own target
+# among the unclaimed frontier cells.
+#
+# With n explorers, an optimal assignment gives each explorer one of its n nearest
+# clusters (one of them is always free to swap to), so the search from each
+# explorer stops once it has reached n clusters, or all of them when there are
+# fewer, and the others keep the UNREACHABLE cost.
+
+from collections import deque
+import numpy as np
+from constants import VS
+from search import NEIGHBOURS, dijkstra
+from assignment import assign
+
+
+class ExplorerManager:
+    PERIOD = 10             # cycles between two assignments
+    CLUSTER_SIZE = 8        # maximum number of frontier cells in a cluster
+    UNREACHABLE = 1e9       # cost of a cluster without a known path to it
+
+    def __init__(self, blackboard, period=PERIOD):
+        """ @param blackboard: the Blackboard of the explorers to coordinate
+            @param period: the number of cycles between two assignments """
+        self.blackboard = blackboard
+        self.period = period
+        self.last_cycle = None  # the cycle of the last assignment
+        self.targets = {}       # explorer: the frontier cell assigned to it
+        blackboard.manager = self
+
+    def target_for(self, explorer):
+        """ @return: the frontier cell assigned to the explorer, or None """
+        cycle = explorer.get_env().cycle
+        target = self.targets.get(explorer)
+        lost = target is not None and target not in self.blackboard.frontier
+
+        if self.last_cycle is None or cycle - self.last_cycle >= self.period or \
+                (lost and cycle != self.last_cycle):
+            self.assign_targets(cycle)
+            target = self.targets.get(explorer)
+
+        if target is None or target not in self.blackboard.frontier:
+            return None
+        return target
+
+    def clusters(self):
+        """ Groups the 8-connected frontier cells, at most CLUSTER_SIZE cells per group
+        @return: a list of lists of pairs (x, y) """
+        frontier = self.blackboard.frontier.cells
+        seen = set()
+        clusters = []
+
+        for cell in frontier:
+            if cell in seen:
+                continue
+            seen.add(cell)
+            queue = deque([cell])
+            cluster = []
+            while queue:
+                current = queue.popleft()
+                cluster.append(current)
+                if len(cluster) == ExplorerManager.CLUSTER_SIZE:
+                    clusters.append(cluster)
+                    cluster = []
+                for dx, dy in NEIGHBOURS:
+                    neighbour = (current[0] + dx, current[1] + dy)
+                    if neighbour in frontier and neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+            if cluster:
+                clusters.append(cluster)
+
+        return clusters
+
+    def assign_targets(self, cycle):
+        """ Assigns a frontier cluster to each active explorer and claims its target
+        @param cycle: the current cycle of the simulation """
+        self.last_cycle = cycle
+        self.targets = {}
+
+        team = [explorer for explorer in self.blackboard.explorers
+                if explorer.get_state() == VS.ACTIVE and not explorer.coming_back
+                and explorer.mode == "frontier"]
+        for explorer in team:
+            self.blackboard.release(explorer)
+
+        clusters = self.clusters()
+        if not team or not clusters:
+            return
+
+        cluster_of = {cell: k for k, cluster in enumerate(clusters) for cell in cluster}
+        cost = np.full((len(team), len(clusters)), ExplorerManager.UNREACHABLE)
+        wanted = min(len(team), len(clusters))
+        nearest = []
+        for i, explorer in enumerate(team):
+            reached = {}    # cluster: its first cell reached, the nearest one
+
+            def stop(cell):
+                k = cluster_of.get(cell)
+                if k is not None and k not in reached:
+                    reached[k] = cell
+                return len(reached) == wanted
+
+            g_score, _ = dijkstra(self.blackboard.map, (explorer.x, explorer.y),
+                                  explorer.COST_LINE, explorer.COST_DIAG, stop)
+            for k, cell in reached.items():
+                cost[i, k] = g_score[cell]
+            nearest.append(reached)
+
+        for i, k in enumerate(assign(cost)):
+            if k >= 0 and k in nearest[i]:
+                self.targets[team[i]] = nearest[i][k]
+                self.blackboard.claim(nearest[i][k], team[i])
@@ -0,0 +1,69 @@
+# Frontier
+#
+# The known cells from which the agent can step into an unknown cell: the border
+# between the explored region and the rest of the grid. The map calls add for
+# every cell it stores and the frontier is updated by looking at the 8 neighbours
+# of that cell only, so each update takes constant time.
+#
+# For each known cell the frontier keeps the mask of its CLEAR directions (bit i
+# for the direction i, in the order of search.NEIGHBOURS) and, for the passable
+# ones, how many of these directions still lead to unknown cells. A cell belongs
+# to the frontier while this count is positive.
+
+from constants import VS
+from search import NEIGHBOURS
+
+
+class Frontier:
+    def __init__(self):
+        self.clear = {}     # (x, y): mask of the CLEAR directions of each known cell
+        self.unknown = {}   # (x, y): number of CLEAR directions to unknown cells
+        self.cells = set()  # the cells with unknown neighbours
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, coord):
+        return coord in self.cells
+
+    def add(self, coord, difficulty, actions_res):
+        """ Stores a cell and updates the frontier around it
+        @param coord: a pair (x, y)
+        @param difficulty: the degree of difficulty to enter the cell
+        @param actions_res: the results of the 8 actions from the cell, as in Map """
+        new = coord not in self.clear
+
+        clear = 0
+        if difficulty < VS.OBST_WALL:
+            for i, res in enumerate(actions_res):
+                if res == VS.CLEAR:
+                    clear |= 1 << i
+        self.clear[coord] = clear
+
+        # the unknown cells reachable from coord
+        count = 0
+        for i, (dx, dy) in enumerate(NEIGHBOURS):
+            if clear >> i & 1 and (coord[0] + dx, coord[1] + dy) not in self.clear:
+                count += 1
+        self.__set_count(coord, count)
+
+        # coord is no longer unknown to its neighbours
+        if new:
+            for i, (dx, dy) in enumerate(NEIGHBOURS):
+                neighbour = (coord[0] - dx, coord[1] - dy)
+                if self.clear.get(neighbour, 0) >> i & 1:
+                    self.__set_count(neighbour, self.unknown[neighbour] - 1)
+
+    def unknown_directions(self, coord):
+        """ @return: the indexes (see search.NEIGHBOURS) of the CLEAR directions from coord
+            that lead to unknown cells """
+        clear = self.clear.get(coord, 0)
+        return [i for i, (dx, dy) in enumerate(NEIGHBOURS)
+                if clear >> i & 1 and (coord[0] + dx, coord[1] + dy) not in self.clear]
+
+    def __set_count(self, coord, count):
+        self.unknown[coord] = count
+        if count > 0:
+            self.cells.add(coord)
+        else:
+            self.cells.discard(coord)
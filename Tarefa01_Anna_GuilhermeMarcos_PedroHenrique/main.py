@@ -5,68 +5,96 @@ import time
 # importa classes
 from environment import Env
 from explorer import Explorer
-from rescuer import Rescuer
+from rescuer import Rescuer, RescueContext
 from rescuer_manager import RescuerManager
+from blackboard import Blackboard
+from explorer_manager import ExplorerManager
 
 
-def main(data_folder_name):
-
-    # Set the path to config files and data files for the environment
-    current_folder = os.path.abspath(os.getcwd())
-    data_folder = os.path.abspath(
-        os.path.join(current_folder, data_folder_name))
-
-    # Instantiate the environment
-    env = Env(data_folder)
+def create_agents(env):
+    """ Instantiates the agents of the simulation in the environment.
+    The environment calls it at each reset"""
 
     # config files for the agents
-    rescuer_file = os.path.join(data_folder, "rescuer_config.txt")
-    explorer_file = os.path.join(data_folder, "explorer_config.txt")
+    rescuer_file = os.path.join(env.data_folder, "rescuer_config.txt")
+    explorer_file = os.path.join(env.data_folder, "explorer_config.txt")
 
     # Instantiate agents rescuer and explorer
+    # the rescuers of this simulation share one context
+    context = RescueContext()
     resc_list = []
 
-    resc1 = Rescuer(env, rescuer_file)
+    resc1 = Rescuer(env, rescuer_file, context)
     resc_list.append(resc1)
-    resc2 = Rescuer(env, rescuer_file)
+    resc2 = Rescuer(env, rescuer_file, context)
     resc_list.append(resc2)
-    resc3 = Rescuer(env, rescuer_file)
+    resc3 = Rescuer(env, rescuer_file, context)
     resc_list.append(resc3)
-    resc4 = Rescuer(env, rescuer_file)
+    resc4 = Rescuer(env, rescuer_file, context)
     resc_list.append(resc4)
 
-    resc_manager = RescuerManager(env, rescuer_file)
+    resc_manager = RescuerManager(env, rescuer_file, context)
 
     # Explorer needs to know rescuer to send the map
     # that's why rescuer is instatiated before
     exp_list = []
+    # exploration mode of the explorers, see Explorer.MODES
+    mode = "frontier"
+    # the explorers share what they learn through a blackboard
+    blackboard = Blackboard()
+    # and a manager assigns them the frontier regions to explore
+    ExplorerManager(blackboard)
 
     exp1 = Explorer(env, explorer_file, resc_manager, [
-                    'DOWN-RIGHT', 'DOWN', 'UP', 'LEFT', 'RIGHT', 'UP-RIGHT', 'UP-LEFT', 'DOWN-LEFT'])
+                    'DOWN-RIGHT', 'DOWN', 'UP', 'LEFT', 'RIGHT', 'UP-RIGHT', 'UP-LEFT', 'DOWN-LEFT'], mode, blackboard)
     exp_list.append(exp1)
     exp2 = Explorer(env, explorer_file, resc_manager, [
-                    'DOWN', 'LEFT', 'UP', 'RIGHT', 'DOWN-LEFT', 'DOWN-RIGHT', 'UP-LEFT', 'UP-RIGHT'])
+                    'DOWN', 'LEFT', 'UP', 'RIGHT', 'DOWN-LEFT', 'DOWN-RIGHT', 'UP-LEFT', 'UP-RIGHT'], mode, blackboard)
     exp_list.append(exp2)
     exp3 = Explorer(env, explorer_file, resc_manager, [
-                    'LEFT', 'DOWN', 'RIGHT', 'UP', 'DOWN-LEFT', 'UP-LEFT', 'DOWN-LEFT', 'UP-LEFT'])
+                    'LEFT', 'DOWN', 'RIGHT', 'UP', 'DOWN-LEFT', 'UP-LEFT', 'DOWN-LEFT', 'UP-LEFT'], mode, blackboard)
     exp_list.append(exp3)
     exp4 = Explorer(env, explorer_file, resc_manager, [
-                    'RIGHT', 'UP', 'LEFT', 'DOWN', 'DOWN-LEFT', 'UP-LEFT', 'UP-LEFT', 'DOWN-LEFT'])
+                    'RIGHT', 'UP', 'LEFT', 'DOWN', 'DOWN-LEFT', 'UP-LEFT', 'UP-LEFT', 'DOWN-LEFT'], mode, blackboard)
     exp_list.append(exp4)
 
     resc_manager.define_rescuers_and_explores(resc_list, exp_list)
 
+
+def create_env(data_folder_name, headless=False, output_folder=Env.FOLDER):
+    """ Instantiates the environment and its agents
+    @param output_folder: the folder for the output files, None for not writing them """
+
+    # Set the path to config files and data files for the environment
+    current_folder = os.path.abspath(os.getcwd())
+    data_folder = os.path.abspath(
+        os.path.join(current_folder, data_folder_name))
+
+    # Instantiate the environment and the agents
+    env = Env(data_folder, headless, setup=create_agents, output_folder=output_folder)
+    env.reset()
+
+    return env
+
+
+def main(data_folder_name, headless=False, output_folder=Env.FOLDER):
+
+    env = create_env(data_folder_name, headless, output_folder)
+
     # Run the environment simulator
-    env.run()
+    return env.run()
 
 
 if __name__ == '__main__':
     """ To get data from a different folder than the default called data
-    pass it by the argument line"""
+    pass it by the argument line. Use --headless to run without the window"""
+
+    headless = "--headless" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--headless"]
 
-    if len(sys.argv) > 1:
-        data_folder_name = sys.argv[1]
+    if len(args) > 0:
+        data_folder_name = args[0]
     else:
         data_folder_name = os.path.join("datasets", "data_42v_20x20")
 
-    main(data_folder_name)
+    main(data_folder_name, headless)
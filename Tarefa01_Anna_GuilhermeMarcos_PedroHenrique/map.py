@@ -2,7 +2,7 @@
 # @Author: Cesar A. Tacla, UTFPR
 #
 # A map representing the explored region of the 2D grid
-# The map is a dictionaire whose keys are pairs (x, y).
+# The map is indexed by pairs (x, y) relative to the base.
 # The map contains only visited positions.
 ##
 # Associated to each key, there are:
@@ -16,7 +16,15 @@
 # VS.WALL the agent cannot execute the action (there is a wall),
 # VS.END  the agent cannot execute the action (end of grid)
 # VS.CLEAR the agent can execute the action
+#
+# The cells are kept in NumPy arrays indexed by [x + origin_x, y + origin_y]: the
+# difficulty (NaN for unknown cells), the victim seq number and the actions' results
+# as two 8-bit masks, bit i for the direction i. A CLEAR direction sets its bit in
+# `clear`, an END direction sets it in `end`, an UNK direction sets both and a WALL
+# direction sets none. When a cell falls outside the arrays, they double in size
+# towards that side and the origin moves accordingly.
 
+import numpy as np
 from constants import VS
 
 
@@ -40,7 +48,13 @@ class Position:
 
 
 class Map:
-    def __init__(self, path_priorities):
+    # initial width and height of the arrays, with the base in the middle
+    INITIAL_SIZE = 16
+
+    def __init__(self, path_priorities, cost_field=None, frontier=None):
+        """ @param path_priorities: the order in which the directions are tried
+            @param cost_field: an optional CostField updated with every added cell
+            @param frontier: an optional Frontier updated with every added cell """
         self.coord_x = 0
         self.coord_y = 0
         self.coordinates_map = {'DOWN-RIGHT': [1, 1], 'DOWN': [1, 0], 'DOWN-LEFT': [1, -1], 'LEFT': [
@@ -50,35 +64,152 @@ class Map:
         self.last_position = Position(self.path_priorities)
         self.last_action = ''
         self.backtracking = False
-        self.map_data = {}
-        self.map_data = {(0, 0): self.position}
+
+        size = Map.INITIAL_SIZE
+        self.origin_x = size // 2
+        self.origin_y = size // 2
+        self.difficulty = np.full((size, size), np.nan)
+        self.victim = np.full((size, size), VS.NO_VICTIM, dtype=np.int32)
+        self.clear = np.zeros((size, size), dtype=np.uint8)
+        self.end = np.zeros((size, size), dtype=np.uint8)
+        self.cells = 0      # number of known cells
+        self.__actions_lut = {}  # (clear, end) masks: list of actions' results
+
+        # the least difficulty of the known cells (walls excluded), for search heuristics
+        self.min_difficulty = float('inf')
+        self.cost_field = cost_field
+        self.frontier = frontier
+
+    def __len__(self):
+        return self.cells
+
+    def __index(self, coord):
+        """ @return: the array indexes of coord, or None if it is outside the arrays """
+        ix = coord[0] + self.origin_x
+        iy = coord[1] + self.origin_y
+        width, height = self.difficulty.shape
+        if 0 <= ix < width and 0 <= iy < height:
+            return ix, iy
+        return None
+
+    def __grow(self, coord):
+        """ Doubles the arrays towards coord until it fits and moves the origin """
+        ix = coord[0] + self.origin_x
+        iy = coord[1] + self.origin_y
+        width, height = self.difficulty.shape
+
+        left = right = 0
+        while ix + left < 0 or ix + left >= width + left + right:
+            if ix + left < 0:
+                left += width + left + right
+            else:
+                right += width + left + right
+
+        top = bottom = 0
+        while iy + top < 0 or iy + top >= height + top + bottom:
+            if iy + top < 0:
+                top += height + top + bottom
+            else:
+                bottom += height + top + bottom
+
+        pad = ((left, right), (top, bottom))
+        self.difficulty = np.pad(self.difficulty, pad, constant_values=np.nan)
+        self.victim = np.pad(self.victim, pad, constant_values=VS.NO_VICTIM)
+        self.clear = np.pad(self.clear, pad)
+        self.end = np.pad(self.end, pad)
+        self.origin_x += left
+        self.origin_y += top
 
     def in_map(self, coord):
-        if coord in self.map_data:
-            return True
+        idx = self.__index(coord)
+        if idx is None:
+            return False
 
-        return False
+        return self.difficulty.item(idx) == self.difficulty.item(idx)  # NaN: unknown
 
     def get(self, coord):
-        """ @param coord: a pair (x, y), the key of the dictionary"""
-        return self.map_data.get(coord)
+        """ @param coord: a pair (x, y), the position relative to the base
+            @return: (difficulty, victim_seq, actions_res) or None if the cell is unknown """
+        idx = self.__index(coord)
+        if idx is None:
+            return None
+
+        difficulty = self.difficulty.item(idx)
+        if difficulty != difficulty:    # NaN: unknown
+            return None
+
+        key = (self.clear.item(idx), self.end.item(idx))
+        actions_res = self.__actions_lut.get(key)
+        if actions_res is None:
+            clear, end = key
+            actions_res = [VS.WALL] * 8
+            for i in range(8):
+                if clear >> i & 1 and end >> i & 1:
+                    actions_res[i] = VS.UNK
+                elif clear >> i & 1:
+                    actions_res[i] = VS.CLEAR
+                elif end >> i & 1:
+                    actions_res[i] = VS.END
+            self.__actions_lut[key] = actions_res
+
+        return (difficulty, self.victim.item(idx), list(actions_res))
+
+    def get_difficulty(self, coord):
+        """ The difficulty alone, for the searches that expand many cells
+        @return: the difficulty of the cell at coord, or None if the cell is unknown """
+        idx = self.__index(coord)
+        if idx is None:
+            return None
+
+        difficulty = self.difficulty.item(idx)
+        if difficulty != difficulty:    # NaN: unknown
+            return None
+        return difficulty
 
     def add(self, coord, difficulty, victim_seq, actions_res):
         """ @param coord: a pair (x, y)
             @param difficulty: the degree of difficulty to acess the cell at coord
             @param victim_seq: the sequential number of the victim returned by the Environment
             @param actions_res: the results of the possible actions from the position (x, y) """
-        self.map_data[coord] = (difficulty, victim_seq, actions_res)
+        idx = self.__index(coord)
+        if idx is None:
+            self.__grow(coord)
+            idx = self.__index(coord)
+
+        clear = end = 0
+        for i, res in enumerate(actions_res):
+            if res == VS.CLEAR or res == VS.UNK:
+                clear |= 1 << i
+            if res == VS.END or res == VS.UNK:
+                end |= 1 << i
+
+        if self.difficulty.item(idx) != self.difficulty.item(idx):
+            self.cells += 1
+        self.difficulty[idx] = difficulty
+        self.victim[idx] = victim_seq
+        self.clear[idx] = clear
+        self.end[idx] = end
+
+        if difficulty < VS.OBST_WALL and difficulty < self.min_difficulty:
+            self.min_difficulty = difficulty
+        if self.cost_field is not None:
+            self.cost_field.add(coord, difficulty)
+        if self.frontier is not None:
+            self.frontier.add(coord, difficulty, actions_res)
+
+    def known_coords(self):
+        """ @return: an array with one row (x, y) per known cell """
+        ix, iy = np.nonzero(~np.isnan(self.difficulty))
+        return np.column_stack((ix - self.origin_x, iy - self.origin_y))
 
     def draw(self):
-        if not self.map_data:
+        if not self.cells:
             print("Map is empty.")
             return
 
-        min_x = min(key[0] for key in self.map_data.keys())
-        max_x = max(key[0] for key in self.map_data.keys())
-        min_y = min(key[1] for key in self.map_data.keys())
-        max_y = max(key[1] for key in self.map_data.keys())
+        coords = self.known_coords()
+        min_x, min_y = coords.min(axis=0)
+        max_x, max_y = coords.max(axis=0)
 
         for y in range(min_y, max_y + 1):
             row = ""
@@ -117,7 +248,7 @@ class Map:
         self.backtracking = False
         mov = (0, 0)
         action = ''
-        while (self.coord_x+mov[1], self.coord_y+mov[0]) in self.map_data and action is not None:
+        while self.in_map((self.coord_x+mov[1], self.coord_y+mov[0])) and action is not None:
             action = self.position.pop_untried()
             if action is not None:
                 mov = self.coordinates_map[action]
@@ -152,11 +283,11 @@ class Map:
 
     def is_position_known(self, x, y):
         """ Verifica se a posição (x, y) já foi visitada """
-        return (x, y) in self.map_data
+        return self.in_map((x, y))
 
     def mark_position_as_known(self, x, y):
         """ Marca a posição (x, y) como conhecida. """
-        self.map_data.add((x, y))
+        self.add((x, y), VS.OBST_NONE, VS.NO_VICTIM, [VS.UNK] * 8)
 
     def is_inside_grid(self, x, y):
         """ Verifica se a posição (x, y) está dentro dos limites do grid. """
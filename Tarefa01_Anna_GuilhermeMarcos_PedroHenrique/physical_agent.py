@@ -1,10 +1,10 @@
 import sys
 import os
-import pygame
 import random
 import csv
 import time
 from constants import VS
+from victim_stats import VictimStats
 
 # Class PhysAgent
 """ It is the representation of an agent in the environment
@@ -28,6 +28,13 @@ class PhysAgent:
         self.y = y_base               # current y coordinate
         self._rtime = mind.TLIM       # current remaining time
         self._state = state           # -1=dead  0=successfully ended 1=alive
+        self.found_stats = VictimStats()  # victims found by this agent
+        self.saved_stats = VictimStats()  # victims saved by this agent
+        self._visit_bit = 0           # bit of the agent in the env visited mask (set by the env)
+        self._sensed = None           # the result of _sense at the current position
+        self._plan = None             # the plan declared by the agent (see _plan_step)
+        self._plan_done = None        # where the executed steps of the plan are appended
+        self._waiting = None          # the condition the agent waits for (see Env.wait)
 
     def set_state(self, state):
         self.state = state
@@ -74,9 +81,9 @@ class PhysAgent:
 
         if (new_x >= 0 and new_x < self.env.dic["GRID_WIDTH"] and
             new_y >= 0 and new_y < self.env.dic["GRID_HEIGHT"] and
-                self.env.obst[new_x][new_y] != 100):
-            # print(f"{self.mind.NAME}: obstacle difficulty {self.env.obst[new_x][new_y]}")
-            self._rtime -= base * self.env.obst[new_x][new_y]
+                self.env.obst[new_x, new_y] != VS.OBST_WALL):
+            # print(f"{self.mind.NAME}: obstacle difficulty {self.env.obst[new_x, new_y]}")
+            self._rtime -= base * self.env.obst[new_x, new_y].item()
 
             # agent is dead: not enough time
             if self._rtime < 0:
@@ -84,14 +91,62 @@ class PhysAgent:
             else:
                 self.x = new_x
                 self.y = new_y
-                if self not in self.env.visited[new_x][new_y]:
-                    self.env.visited[new_x][new_y].append(self)
+                self._sensed = None
+                if not self.env.visited[new_x, new_y] & self._visit_bit:
+                    self.env.visited[new_x, new_y] |= self._visit_bit
+                    self.env.dirty.add((new_x, new_y))
                 return VS.EXECUTED
         else:
             # when the agent bumps, we penalize the agent subtracting only the base time from the remaing time
             self._rtime -= base
             return VS.BUMPED
 
+    def _follow_path(self, moves):
+        """ Protected method for walking several steps in a row, each one as _walk does.
+        It stops at the first step that is not executed.
+        @param moves: a sequence of pairs (dx, dy), each coordinate in {-1, 0, 1}
+        @returns a pair (result, steps): the result of the last walk (VS.EXECUTED if every
+        step was executed) and the number of executed steps """
+
+        for dx, dy in moves:
+            if dx not in (-1, 0, 1) or dy not in (-1, 0, 1):
+                raise ValueError(f"{self.mind.NAME}: invalid move ({dx}, {dy})")
+
+        for steps, (dx, dy) in enumerate(moves):
+            result = self._walk(dx, dy)
+            if result != VS.EXECUTED:
+                return result, steps
+
+        return VS.EXECUTED, len(moves)
+
+    def _plan_step(self):
+        """ Protected method for executing the next route of the declared plan, used by the
+        environment in fast-forward: the steps (dx, dy, vict) up to the first one with vict True,
+        walked as _follow_path does, and then the first aid. This is what the agent would do
+        in one deliberation. The executed steps are moved from the plan to the done list.
+        A step that cannot be executed is removed from the plan too, without being done, and
+        the declaration is withdrawn.
+        @returns the result of the walk """
+
+        steps = 0
+        while steps < len(self._plan) and not self._plan[steps][2]:
+            steps += 1
+        route = self._plan[:steps + 1]
+
+        result, steps = self._follow_path([(dx, dy) for dx, dy, _ in route])
+        if self._plan_done is not None:
+            self._plan_done.extend(route[:steps])
+
+        if result != VS.EXECUTED:
+            del self._plan[:steps + 1]
+            self._plan = None
+            return result
+
+        del self._plan[:steps]
+        if route[-1][2]:
+            self._first_aid()
+        return result
+
     def _check_walls_and_lim(self):
         """ Protected method for checking walls and the grid limits in the neighborhood of the current position of the agent.
         @returns a vector of eight integers indexed in a clockwise manner. The first position in the vector is
@@ -102,37 +157,24 @@ class PhysAgent:
         END means the end of the grid (value = 2)
         """
 
-        delta = [(0, -1), (1, -1), (1, 0), (1, 1),
-                 (0, 1), (-1, 1), (-1, 0), (-1, -1)]
-        obstacles = [VS.CLEAR] * 8
-        i = 0
-
-        for d in delta:
-            new_x = self.x + d[0]
-            new_y = self.y + d[1]
-
-            if new_x < 0 or new_x >= self.env.dic["GRID_WIDTH"] or new_y < 0 or new_y >= self.env.dic["GRID_HEIGHT"]:
-                obstacles[i] = VS.END
-            elif self.env.obst[new_x][new_y] == 100:
-                obstacles[i] = VS.WALL
+        return self.env.check_neighbours(self.x, self.y)
 
-            i += 1
+    def _sense(self):
+        """ Protected method for sensing the current position of the agent. The result is
+        kept until the agent walks to another position.
+        @returns a pair (obstacles, seq): the tuple of eight integers of _check_walls_and_lim
+        and the result of _check_for_victim """
 
-        # print(f"({self.x},{self.y}): obstacles={obstacles}")
-
-        return obstacles
+        if self._sensed is None:
+            self._sensed = (tuple(self._check_walls_and_lim()), self._check_for_victim())
+        return self._sensed
 
     def _check_for_victim(self):
         """ Public method for testing if there is a victim at the current position of the agent
         @returns: the sequential number of the victim - an integer starting from zero that corresponds to the position of
         the victim in the data files victims.txt and vital_signals.txt or VS.NO_VICTIMif there is no victim at the current position of the agent"""
 
-        vic_id = VS.NO_VICTIM
-
-        if (self.x, self.y) in self.env.victims:
-            vic_id = self.env.victims.index((self.x, self.y))
-
-        return vic_id
+        return self.env.victim_at.get((self.x, self.y), VS.NO_VICTIM)
 
     def _read_vital_signals(self):
         """ Public method for reading the vital signals and marking a victim as found. The agent can only
@@ -158,6 +200,9 @@ class PhysAgent:
         # Mark the victim as found by this agent.
         # More than one agent can found the same victim, so it's a list
         self.env.found[seq].append(self)
+        self.env.dirty.add((self.x, self.y))
+        self.found_stats.add(seq, self.env.sev_label[seq], self.env.sev_value[seq])
+        self.env.found_stats.add(seq, self.env.sev_label[seq], self.env.sev_value[seq])
         return self.env.signals[seq]
 
     def _first_aid(self):
@@ -183,32 +228,19 @@ class PhysAgent:
         # Mark the victim as found by this agent.
         # More than one agent can drop a first-aid package to the same victim, so it's a list
         self.env.saved[seq].append(self)
+        self.env.dirty.add((self.x, self.y))
+        self.saved_stats.add(seq, self.env.sev_label[seq], self.env.sev_value[seq])
+        self.env.saved_stats.add(seq, self.env.sev_label[seq], self.env.sev_value[seq])
         return True
 
     def _get_found_victims(self):
         """ Public method for returning the number of found victims by the agent
         @returns a list with the sequential number of found victims """
 
-        victims = []
-
-        v = 0
-        for finders in self.env.found:
-            if self in finders:
-                victims.append(v)
-            v = v + 1
-
-        return victims
+        return sorted(self.found_stats.victims)
 
     def _get_saved_victims(self):
         """ Public method for returning the number of saved victims by the agent
         @returns a list with the sequential number of saved victims """
 
-        victims = []
-
-        v = 0
-        for rescuers in self.env.saved:
-            if self in rescuers:
-                victims.append(v)
-            v = v + 1
-
-        return victims
+        return sorted(self.saved_stats.victims)
@@ -13,19 +13,29 @@ from constants import VS
 from abc import ABC, abstractmethod
 
 
+class RescueContext:
+    """ The state shared by the rescuers of one simulation. Each simulation has its own
+    context, so several simulations may run in the same process """
+
+    def __init__(self):
+        self.cluster_ready = False              # the clusters were assigned to the rescuers
+        self.all_rescuers_known_victims = []    # victims known by all the rescuers
+
+
 # Classe que define o Agente Rescuer com um plano fixo
 class Rescuer(AbstAgent):
 
-    cluster_ready = False
-    all_rescuers_known_victims = []
-
-    def __init__(self, env, config_file):
+    def __init__(self, env, config_file, context=None):
         """ 
         @param env: a reference to an instance of the environment class
-        @param config_file: the absolute path to the agent's config file"""
+        @param config_file: the absolute path to the agent's config file
+        @param context: the RescueContext shared with the other rescuers of the simulation"""
 
         super().__init__(env, config_file)
 
+        # state shared with the other rescuers and the rescuer manager
+        self.context = context if context is not None else RescueContext()
+
         # Specific initialization for the rescuer
         self.map = {}             # explorer will pass the map
         self.victims = {}         # list of found victims
@@ -37,6 +47,7 @@ class Rescuer(AbstAgent):
         self.plan_walk_time = 0.0   # previewed time to walk during rescue
         self.x = 0                  # the current x position of the rescuer when executing the plan
         self.y = 0                  # the current y position of the rescuer when executing the plan
+        self.walked = []            # the plan steps executed by the environment in fast-forward
 
         # Starts in IDLE state.
         # It changes to ACTIVE when the map arrives
@@ -213,25 +224,47 @@ class Rescuer(AbstAgent):
         @return True: there's one or more actions to do
         @return False: there's no more action to do """
 
-        if not Rescuer.cluster_ready:
+        if not self.context.cluster_ready:
+            self.wait("cluster assigned")
             return True
 
+        # the steps executed by the environment since the last deliberation
+        for dx, dy, _ in self.walked:
+            self.x += dx
+            self.y += dy
+        self.walked.clear()
+
         # No more actions to do
         if self.plan == []:  # empty list, no more actions to do
-            input(f"{self.NAME} has finished the plan [ENTER]")
+            if not self.get_env().headless:
+                input(f"{self.NAME} has finished the plan [ENTER]")
             return False
 
-        # Takes the first action of the plan (walk action) and removes it from the plan
-        dx, dy, there_is_vict = self.plan.pop(0)
-        print(f"{self.NAME} pop dx: {dx} dy: {dy} vict: {there_is_vict}")
+        # the rest of the plan needs no decision: the environment may run it by itself
+        self.declare_plan(self.plan, self.walked)
 
-        # Walk - just one step per deliberation
-        walked = self.walk(dx, dy)
+        # Takes the walk actions of the plan up to the next victim
+        moves = []
+        there_is_vict = False
+        while len(moves) < len(self.plan) and not there_is_vict:
+            dx, dy, there_is_vict = self.plan[len(moves)]
+            moves.append((dx, dy))
+        print(f"{self.NAME} pop {len(moves)} moves, vict: {there_is_vict}")
 
-        # Rescue the victim at the current position
-        if walked == VS.EXECUTED:
+        # Walk the whole route in one action
+        walked, steps = self.follow_path(moves)
+        for dx, dy in moves[:steps]:
             self.x += dx
             self.y += dy
+
+        # Removes the executed steps from the plan, plus the step that failed, if any, which is
+        # dropped as a failed single walk is; the rest of the route stays in the plan
+        if walked != VS.EXECUTED:
+            steps += 1
+        del self.plan[:steps]
+
+        # Rescue the victim at the current position
+        if walked == VS.EXECUTED:
             print(f"{self.NAME} Walk ok - Rescuer at position ({self.x}, {self.y})")
             # check if there is a victim at the current position
             if there_is_vict:
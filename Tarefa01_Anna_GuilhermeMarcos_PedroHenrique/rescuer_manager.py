@@ -1,18 +1,36 @@
 from rescuer import Rescuer
 from constants import VS
 from kmeans import KMeans
+from distance_service import DistanceService
+from map import Map
 import csv
+import os
 
 class RescuerManager(Rescuer):
+    """ Gathers the reports of the explorers and assigns a cluster of victims to each rescuer.
+    The explorers report while exploring (see report): the merged map and victims are kept up to
+    date, and so are provisional clusters. The final clusters are assigned as soon as every
+    explorer has finished exploring, even if some of them are still on their way back. """
 
-    cluster_ready = False
+    # new victims between two provisional clusterings
+    CLUSTER_STEP = 10
 
-    def __init__(self, env, config_file):
-        super().__init__(env, config_file)
+    def __init__(self, env, config_file, context=None):
+        super().__init__(env, config_file, context)
 
-        #self.set_state(VS.ACTIVE)
+        # active since the begin, it waits for the end of the exploration (see deliberate)
+        self.set_state(VS.ACTIVE)
         self.rescuers = []
         self.explores = []
+        self.known_cells = set()    # the positions in known_map, for membership tests
+        # the victims reported by all the explorers; known_victims becomes the manager's
+        # own cluster once the clusters are assigned (see set_group)
+        self.all_victims = []
+        self.victim_ids = set()     # the seq numbers of the victims in all_victims
+        self.explored = set()       # the explorers that have finished exploring
+        self.groups = None          # the clusters of the first clustered_victims victims
+        self.clustered_victims = 0
+        self.distances = None       # the DistanceService of the known victims
 
     def define_rescuers_and_explores(self, list_rescuers, list_explores):
         self.rescuers = list_rescuers
@@ -26,21 +44,82 @@ class RescuerManager(Rescuer):
 
         return True
 
+    def exploration_finished(self):
+        """ @return: True when no explorer will report new victims """
+        return all(explorer in self.explored or explorer.get_state() != VS.ACTIVE
+                   for explorer in self.explores)
+
+    def report(self, explorer, cells, victims, final=False):
+        """ Receives the positions and victims an explorer found since its last report
+        @param explorer: the reporting explorer
+        @param cells: the new visited positions [x, y]
+        @param victims: the new victims ((x, y), <vs>)
+        @param final: True when the explorer has finished exploring """
+        self.combine_maps(cells, victims)
+        if final:
+            self.explored.add(explorer)
+
+        if self.context.cluster_ready:
+            return
+
+        if len(self.all_victims) - self.clustered_victims >= RescuerManager.CLUSTER_STEP:
+            self.update_clusters()
+
+        if self.exploration_finished():
+            self.notify("exploration finished")    # time to assign the clusters
+
+    def update_clusters(self):
+        """ Clusters the victims known so far """
+        self.groups = KMeans().execute(self.all_victims, 4)
+        self.clustered_victims = len(self.all_victims)
+
+    def merged_map(self):
+        """ @return: a Map of the cells known by any explorer; the explorers' own Map when
+            they all share it through a Blackboard """
+        maps = list({id(explorer.map): explorer.map for explorer in self.explores}.values())
+        if len(maps) == 1:
+            return maps[0]
+
+        merged = Map([])
+        for map in maps:
+            for x, y in map.known_coords().tolist():
+                if not merged.in_map((x, y)):
+                    merged.add((x, y), *map.get((x, y)))
+        return merged
+
+    def compute_distances(self, processes=None):
+        """ Computes the travel costs between the base and the known victims over the map
+        merged from all the explorers (see merged_map)
+        @param processes: the number of worker processes (None = see DistanceService)
+        @return: the DistanceService; its points are the base followed by all_victims """
+        self.distances = DistanceService(self.merged_map(), self.COST_LINE, self.COST_DIAG,
+                                         processes)
+        points = [(0, 0)] + [victim[0] for victim in self.all_victims]
+        self.distances.compute(points)
+        return self.distances
+
     def rescuers_finished(self):
         # Verifica se todos os resgatadores estão inativos
         return all(rescuer.get_state() != 'ATIVE' for rescuer in self.rescuers)
 
     def combine_maps(self, path, victims):
+        """ Merges the positions and the victims reported by an explorer
+        @param path: the visited positions [x, y]
+        @param victims: the found victims ((x, y), <vs>), <vs>[0] being the seq number """
         # self.know_map.update(path)
         # self.know_victims.update(victims)
 
-        for i, coord in enumerate(path):
-            if coord not in self.known_map:
+        for coord in path:
+            key = tuple(coord)
+            if key not in self.known_cells:
+                self.known_cells.add(key)
                 self.known_map.append(coord)
 
-        for i, victim in enumerate(victims):
-            if victim not in self.known_victims:
-                self.known_victims.append(victim)
+        for victim in victims:
+            seq = victim[1][0]
+            if seq not in self.victim_ids:
+                self.victim_ids.add(seq)
+                self.all_victims.append(victim)
 
         #for rescuer in self.rescuers:
         #    rescuer.go_save_victims(self.known_map, self.known_victims)
@@ -56,9 +135,12 @@ class RescuerManager(Rescuer):
 
     def clusterize(self):
         print("Clustering...")
-        cluster = KMeans()
-        groups = cluster.execute(self.known_victims, 4)
-        Rescuer.all_rescuers_known_victims = self.known_victims.copy()
+        if self.groups is None or self.clustered_victims != len(self.all_victims):
+            self.update_clusters()
+        groups = self.groups
+        self.context.all_rescuers_known_victims = self.all_victims.copy()
+        # the travel costs are ready before any rescuer plans its cluster
+        self.compute_distances()
 
         for i, rescuer in enumerate(self.rescuers):
             rescuer.set_group(groups[i])
@@ -67,11 +149,17 @@ class RescuerManager(Rescuer):
         self.set_group(groups[len(groups) - 1])
         self.write_group_csv(groups[len(groups) - 1], len(groups))
 
-        Rescuer.cluster_ready = True
+        self.context.cluster_ready = True
+        self.notify("cluster assigned")
 
     def write_group_csv(self, group, group_number):
+        # the clusters' files go to the output folder of the environment, if any
+        folder = self.get_env().output_folder
+        if folder is None:
+            return
+
         # Specify the filename for your CSV file
-        filename = f'cluster{group_number}.txt'
+        filename = os.path.join(folder, f'cluster{group_number}.txt')
 
         # Open the CSV file in write mode and create a CSV writer
         with open(filename, 'w', newline='') as csvfile:
@@ -90,12 +178,13 @@ class RescuerManager(Rescuer):
         @return True: there's one or more actions to do
         @return False: there's no more action to do """
         
-        if Rescuer.cluster_ready == False:
+        if self.context.cluster_ready == False:
 
-            if self.explorers_finished():
+            if self.exploration_finished():
                 self.clusterize()
                 self.notify_rescuers_to_plan()
             else:
+                self.wait("exploration finished")
                 return True
             
         # No more actions to do
@@ -0,0 +1,155 @@
+# Grid search
+#
+# Shortest paths over the cells known by an agent (a Map). Entering a cell costs
+# COST_LINE (horizontal or vertical step) or COST_DIAG (diagonal step) times the
+# difficulty of the cell, the same time the environment discounts for a walk action.
+# Cells with difficulty VS.OBST_WALL and unknown cells are not crossed.
+#
+# The open list is a binary heap (heapq) with lazy deletion: a cell may be pushed
+# more than once and the stale entries are discarded when popped. The three searches
+# share this expansion loop (see _expand); they differ only in the heuristic and in
+# when they stop.
+
+import heapq
+from constants import VS
+
+# Increments to the 8 neighbours of a cell: up, up-right, right, ..., up-left
+NEIGHBOURS = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+
+
+def step_cost(dx, dy, cost_line, cost_diag):
+    """ @return: the base cost of the walk action (dx, dy), multiplied by the difficulty
+        of the entered cell to get the time of the walk """
+    return cost_line if dx == 0 or dy == 0 else cost_diag
+
+
+def octile(a, b, cost_line, cost_diag):
+    """ Cost of the shortest path from a to b in an empty 8-connected grid
+    @param a, b: pairs (x, y) """
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return cost_line * abs(dx - dy) + cost_diag * min(dx, dy)
+
+
+def astar(map, start, goal, cost_line, cost_diag):
+    """ A* search from start to goal over the known cells of the map
+    @param map: a Map; the difficulty of a cell is returned by map.get_difficulty
+    @param start, goal: pairs (x, y)
+    @param cost_line, cost_diag: the costs of the walk actions of the agent
+    @return: the list of positions from start to goal (both included) with the least
+             cost, or None if there is no known path """
+
+    # the heuristic is scaled by the least known difficulty so it never overestimates
+    weight = min(map.min_difficulty, VS.OBST_NONE)
+
+    def heuristic(cell):
+        return weight * octile(cell, goal, cost_line, cost_diag)
+
+    came_from = {}
+    for _, current in _expand(map, start, cost_line, cost_diag, {}, came_from, heuristic):
+        if current == goal:
+            return _path(came_from, goal)
+
+    return None  # No path found
+
+
+def best_target(map, start, targets, bias, cost_line, cost_diag):
+    """ Dijkstra search from start for the target with the least path cost plus bias
+    @param map: a Map, as in astar
+    @param start: a pair (x, y)
+    @param targets: a container of pairs (x, y)
+    @param bias: a function of a target returning a cost (>= 0) added to its path cost
+    @param cost_line, cost_diag: the costs of the walk actions of the agent
+    @return: the list of positions from start to the chosen target (both included), or
+             None if no target is reachable over the known cells """
+
+    came_from = {}
+    best, best_score = None, float('inf')
+
+    for g_current, current in _expand(map, start, cost_line, cost_diag, {}, came_from):
+        if g_current >= best_score:
+            break       # the bias is never negative: no farther target can do better
+
+        if current in targets:
+            score = g_current + bias(current)
+            if score < best_score:
+                best, best_score = current, score
+
+    if best is None:
+        return None
+
+    return _path(came_from, best)
+
+
+def dijkstra(map, start, cost_line, cost_diag, stop=None):
+    """ Least path costs from start to the known cells of the map
+    @param map: a Map, as in astar
+    @param start: a pair (x, y)
+    @param cost_line, cost_diag: the costs of the walk actions of the agent
+    @param stop: an optional function called with each cell whose least cost is
+                 known, in increasing cost order; the search ends when it returns True
+    @return: (g_score, came_from): the least cost to each reached cell and the
+             previous cell on its least-cost path """
+
+    g_score = {}
+    came_from = {}
+    for _, current in _expand(map, start, cost_line, cost_diag, g_score, came_from):
+        if stop is not None and stop(current):
+            break
+
+    return g_score, came_from
+
+
+def _expand(map, start, cost_line, cost_diag, g_score, came_from, heuristic=None):
+    """ Expands the known cells from start in increasing order of least cost, plus the
+    heuristic if any (A*). The search goes on while the caller asks for more cells.
+    @param g_score, came_from: dictionaries filled with the least cost to each reached
+                               cell and the previous cell on its least-cost path
+    @param heuristic: an optional function of a cell, never overestimating its cost to
+                      the goal
+    @return: a generator of the pairs (least cost, cell) of the expanded cells; each cell
+             is yielded before its neighbours are reached """
+
+    steps = [(dx, dy, step_cost(dx, dy, cost_line, cost_diag)) for dx, dy in NEIGHBOURS]
+    get_difficulty = map.get_difficulty
+    g_score[start] = 0.0
+    closed = set()
+    counter = 0     # breaks ties by insertion order, so positions are never compared
+    open_heap = [(heuristic(start) if heuristic else 0.0, counter, start)]
+
+    while open_heap:
+        _, _, current = heapq.heappop(open_heap)
+
+        if current in closed:
+            continue    # stale entry: the cell was already expanded with a lower cost
+
+        closed.add(current)
+        g_current = g_score[current]
+        yield g_current, current
+
+        for dx, dy, step in steps:
+            neighbour = (current[0] + dx, current[1] + dy)
+            if neighbour in closed:
+                continue
+
+            difficulty = get_difficulty(neighbour)
+            if difficulty is None or difficulty >= VS.OBST_WALL:
+                continue
+
+            tentative = g_current + step * difficulty
+
+            if tentative < g_score.get(neighbour, float('inf')):
+                g_score[neighbour] = tentative
+                came_from[neighbour] = current
+                counter += 1
+                f = tentative + heuristic(neighbour) if heuristic else tentative
+                heapq.heappush(open_heap, (f, counter, neighbour))
+
+
+def _path(came_from, goal):
+    """ @return: the list of positions from the start of a search to goal (both included),
+        read from the came_from links """
+    path = [goal]
+    while path[-1] in came_from:
+        path.append(came_from[path[-1]])
+    return path[::-1]
@@ -0,0 +1,40 @@
+# Grid maps for the tests
+#
+# Small maps drawn as text, and the cost of walking a path over them.
+
+from constants import VS
+from map import Map
+from search import NEIGHBOURS, step_cost
+
+COST_LINE = 1.0
+COST_DIAG = 1.5
+
+
+def grid_map(rows, **kwargs):
+    """ @param rows: strings, one per y; '.' is a cell of difficulty 1, a digit a cell of that
+        difficulty, '#' a wall and ' ' an unknown cell
+        @return: a Map with the cells known, (0, 0) being the top left one """
+    map = Map([], **kwargs)
+    cells = {}
+    for y, row in enumerate(rows):
+        for x, c in enumerate(row):
+            if c != ' ':
+                cells[(x, y)] = VS.OBST_WALL if c == '#' else (1.0 if c == '.' else float(c))
+
+    for (x, y), difficulty in cells.items():
+        actions_res = []
+        for dx, dy in NEIGHBOURS:
+            neighbour = cells.get((x + dx, y + dy))
+            actions_res.append(VS.WALL if neighbour == VS.OBST_WALL else VS.CLEAR)
+        map.add((x, y), difficulty, VS.NO_VICTIM, actions_res)
+    return map
+
+
+def path_cost(map, path):
+    """ @return: the time to walk the path, a list of neighbouring positions """
+    cost = 0.0
+    for a, b in zip(path, path[1:]):
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        assert max(abs(dx), abs(dy)) == 1
+        cost += step_cost(dx, dy, COST_LINE, COST_DIAG) * map.get(b)[0]
+    return cost
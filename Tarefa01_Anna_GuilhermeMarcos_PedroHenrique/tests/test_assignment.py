@@ -0,0 +1,57 @@
+# Assignment
+#
+# The shortest augmenting path solver against a brute-force search over all
+# the assignments of small cost matrices.
+
+import os
+import sys
+import random
+import unittest
+from itertools import permutations
+import numpy as np
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FOLDER)
+
+from assignment import assign
+
+
+def brute_force(cost):
+    n, m = cost.shape
+    if n <= m:
+        return min(sum(cost[i, j] for i, j in enumerate(cols))
+                   for cols in permutations(range(m), n))
+    return brute_force(cost.T)
+
+
+class TestAssignment(unittest.TestCase):
+    def assertValid(self, cost, cols):
+        n, m = cost.shape
+        self.assertEqual(len(cols), n)
+        assigned = [j for j in cols if j >= 0]
+        self.assertEqual(len(assigned), min(n, m))
+        self.assertEqual(len(set(assigned)), len(assigned))
+
+    def test_against_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            n, m = rng.randint(1, 5), rng.randint(1, 5)
+            cost = np.array([[rng.choice([rng.random() * 10, rng.randint(0, 3)]) for _ in range(m)]
+                             for _ in range(n)])
+            cols = assign(cost)
+            self.assertValid(cost, cols)
+            total = sum(cost[i, j] for i, j in enumerate(cols) if j >= 0)
+            self.assertAlmostEqual(total, brute_force(cost))
+
+    def test_more_rows_than_columns(self):
+        cost = np.array([[5.0], [1.0], [3.0]])
+        self.assertEqual(assign(cost).tolist(), [-1, 0, -1])
+
+    def test_no_feasible_assignment(self):
+        cost = np.array([[1.0, np.inf], [2.0, np.inf]])
+        with self.assertRaises(ValueError):
+            assign(cost)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# Cost field
+#
+# The incremental cost-to-base field must hold the same costs as searching
+# each cell's way back to the base from scratch, whatever the order in which
+# the cells are discovered.
+
+import os
+import sys
+import random
+import unittest
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+FOLDER = os.path.dirname(TESTS)
+sys.path[:0] = [FOLDER, TESTS]
+
+from constants import VS
+from cost_field import CostField
+import search
+from grid import grid_map, path_cost, COST_LINE, COST_DIAG
+
+
+class TestCostField(unittest.TestCase):
+    def assertMatchesSearch(self, field, map):
+        for x, y in map.known_coords().tolist():
+            if map.get((x, y))[0] >= VS.OBST_WALL:
+                self.assertEqual(field.cost((x, y)), float('inf'))
+                continue
+            path = search.astar(map, (x, y), (0, 0), COST_LINE, COST_DIAG)
+            if path is None:
+                self.assertEqual(field.cost((x, y)), float('inf'))
+                self.assertIsNone(field.path_to_base((x, y)))
+                continue
+            self.assertAlmostEqual(field.cost((x, y)), path_cost(map, path))
+            way_back = [(x, y)] + field.path_to_base((x, y))
+            self.assertEqual(way_back[-1], (0, 0))
+            self.assertAlmostEqual(path_cost(map, way_back), field.cost((x, y)))
+
+    def test_cells_added_in_any_order(self):
+        rng = random.Random(7)
+        for _ in range(10):
+            rows = ["".join(rng.choice("....2379#") for _ in range(7)) for _ in range(7)]
+            rows[0] = "." + rows[0][1:]
+            reference = grid_map(rows)
+
+            field = CostField(COST_LINE, COST_DIAG)
+            cells = reference.known_coords().tolist()
+            rng.shuffle(cells)
+            for x, y in cells:
+                field.add((x, y), reference.get((x, y))[0])
+            self.assertGreater(len(field.dist), 1)
+            self.assertMatchesSearch(field, reference)
+
+    def test_cell_getting_harder_or_becoming_a_wall(self):
+        map = grid_map(["...",
+                        "...",
+                        "..."], cost_field=CostField(COST_LINE, COST_DIAG))
+        field = map.cost_field
+        self.assertAlmostEqual(field.cost((2, 2)), 2 * COST_DIAG)
+
+        map.add((1, 1), 5.0, VS.NO_VICTIM, [VS.CLEAR] * 8)
+        self.assertMatchesSearch(field, map)
+        self.assertEqual(field.max_difficulty, 5.0)
+
+        map.add((1, 1), VS.OBST_WALL, VS.NO_VICTIM, [VS.CLEAR] * 8)
+        self.assertMatchesSearch(field, map)
+        self.assertAlmostEqual(field.cost((2, 2)), 2 * COST_LINE + COST_DIAG)
+
+    def test_cell_read_again_with_float_noise(self):
+        map = grid_map(["...",
+                        ".2.",
+                        "..."], cost_field=CostField(COST_LINE, COST_DIAG))
+        field = map.cost_field
+        rebuilds = []
+        field._CostField__rebuild = lambda: rebuilds.append(True)
+
+        # the difficulty is measured from the time of a walk: entering again gives noise
+        map.add((1, 1), 2.0 + 1e-12, VS.NO_VICTIM, [VS.CLEAR] * 8)
+        map.add((2, 2), 1.0 - 1e-12, VS.NO_VICTIM, [VS.CLEAR] * 8)
+        self.assertEqual(rebuilds, [])
+        self.assertEqual(field.difficulty[(1, 1)], 2.0)
+
+        # a real increase still rebuilds
+        map.add((1, 1), 3.0, VS.NO_VICTIM, [VS.CLEAR] * 8)
+        self.assertEqual(rebuilds, [True])
+
+    def test_unreachable_cells(self):
+        field = CostField(COST_LINE, COST_DIAG)
+        field.add((5, 5), 1.0)
+        self.assertEqual(field.cost((5, 5)), float('inf'))
+        self.assertIsNone(field.path_to_base((5, 5)))
+        field.add((0, 0), 1.0)
+        self.assertIsNone(field.path_to_base((5, 5)))
+        self.assertEqual(field.path_to_base((0, 0)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# Distance service
+#
+# The costs between the points must be those of the A* paths over the same
+# map. The cost matrices are saved in the cache folder and loaded back,
+# memory-mapped, for the same map and points; files that do not fit the
+# points are computed again.
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+FOLDER = os.path.dirname(TESTS)
+sys.path[:0] = [FOLDER, TESTS]
+
+import distance_service
+from distance_service import DistanceService
+import search
+from grid import grid_map, path_cost, COST_LINE, COST_DIAG
+
+ROWS = ["..2.",
+        ".#3.",
+        "...."]
+POINTS = [(0, 0), (3, 0), (3, 2), (0, 2)]
+
+
+class TestMatrix(unittest.TestCase):
+    def test_matches_astar(self):
+        map = grid_map(["..3...#.",
+                        ".##.5.#.",
+                        "..#..2..",
+                        "9.#.###.",
+                        "....1..#",
+                        "##   ..."])
+        # the last two points are unknown cells: there is no known path to or from them
+        points = [(0, 0), (7, 0), (5, 2), (0, 3), (4, 4), (7, 5), (3, 5), (9, 9)]
+        service = DistanceService(map, COST_LINE, COST_DIAG, processes=1, cache_folder=None)
+        matrix = service.compute(points)
+        self.assertEqual(matrix.shape, (len(points), len(points)))
+
+        for i, a in enumerate(points):
+            for j, b in enumerate(points):
+                path = search.astar(map, a, b, COST_LINE, COST_DIAG) if map.in_map(a) else None
+                if path is None:
+                    self.assertEqual(matrix[i, j], float('inf'), (a, b))
+                    self.assertIsNone(service.path(i, j))
+                else:
+                    self.assertAlmostEqual(matrix[i, j], path_cost(map, path), places=4,
+                                           msg=(a, b))
+                    self.assertAlmostEqual(path_cost(map, service.path(i, j)),
+                                           path_cost(map, path), places=4)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.map = grid_map(ROWS)
+
+    def service(self):
+        return DistanceService(self.map, COST_LINE, COST_DIAG, processes=1,
+                               cache_folder=self.folder.name)
+
+    def test_round_trip(self):
+        first = self.service()
+        matrix = first.compute(POINTS)
+        self.assertFalse(isinstance(matrix, np.memmap))
+        self.assertEqual(sorted(os.listdir(self.folder.name)),
+                         [f"{first.cache_key(POINTS)}.matrix.npy",
+                          f"{first.cache_key(POINTS)}.pred.npy"])
+
+        # same map and points: the same key, and no search runs
+        second = self.service()
+        self.assertEqual(second.cache_key(POINTS), first.cache_key(POINTS))
+        with mock.patch.object(distance_service, "_search", side_effect=AssertionError):
+            loaded = second.compute(POINTS)
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, matrix)
+        self.assertEqual(second.path(0, 2), first.path(0, 2))
+
+    def test_other_points_other_key(self):
+        service = self.service()
+        self.assertNotEqual(service.cache_key(POINTS), service.cache_key(POINTS[:3]))
+        service.compute(POINTS)
+        self.assertEqual(service.compute(POINTS[:3]).shape, (3, 3))
+
+    def test_shape_mismatch_is_computed_again(self):
+        service = self.service()
+        key = service.cache_key(POINTS)
+        for name in ("matrix", "pred"):
+            np.save(os.path.join(self.folder.name, f"{key}.{name}.npy"),
+                    np.zeros((2, 2), dtype=np.float32))
+
+        matrix = self.service().compute(POINTS)
+        self.assertFalse(isinstance(matrix, np.memmap))
+        np.testing.assert_array_equal(
+            matrix, DistanceService(self.map, COST_LINE, COST_DIAG, processes=1,
+                                    cache_folder=None).compute(POINTS))
+        self.assertEqual(np.load(os.path.join(self.folder.name, f"{key}.matrix.npy")).shape,
+                         (len(POINTS), len(POINTS)))
+
+
+if __name__ == '__main__':
+    unittest.main()
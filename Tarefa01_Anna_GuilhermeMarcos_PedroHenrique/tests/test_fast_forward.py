@@ -0,0 +1,72 @@
+# Fast-forward of the declared plans
+#
+# A rescuer follows a fixed plan with bumps into the walls and the end of the
+# grid. Running it with Env.run, which fast-forwards the plan, must give the
+# same cycles, positions, remaining times and rescues as calling Env.step
+# cycle by cycle, where the rescuer deliberates every route itself.
+
+import os
+import sys
+import unittest
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FOLDER)
+
+from environment import Env
+from rescuer import Rescuer, RescueContext
+from constants import VS
+
+DATA_FOLDER = os.path.join(FOLDER, "datasets", "data_42v_20x20")
+
+# from the base (5, 10): rescues at (2, 10), (3, 9), (7, 7), (7, 2) and (8, 4), with bumps
+# into walls in the middle of a route, on a step with a victim flag and twice in a row
+PLAN = [(-1, 0, False), (-1, 0, False), (-1, 0, True),
+        (0, 1, False), (-1, 0, False), (0, -1, True),
+        (1, 0, False), (1, 0, True),
+        (1, -1, False), (0, -1, True),
+        (1, 0, False), (1, 0, False), (1, -1, True),
+        (0, -1, False), (0, -1, False), (0, -1, False), (0, -1, False), (0, -1, True),
+        (0, -1, False), (0, -1, False), (1, 1, True),
+        (0, 1, True)]
+
+
+def setup(env):
+    context = RescueContext()
+    context.cluster_ready = True
+    rescuer = Rescuer(env, os.path.join(env.data_folder, "rescuer_config.txt"), context)
+    rescuer.plan = list(PLAN)
+    rescuer.set_state(VS.ACTIVE)
+
+
+def outcome(env):
+    body = env.agents[0]
+    return (env.cycle, body.x, body.y, body._rtime, body._state, body._get_saved_victims())
+
+
+class TestFastForward(unittest.TestCase):
+    def setUp(self):
+        self.env = Env(DATA_FOLDER, headless=True, setup=setup, output_folder=None)
+
+    def test_plan_with_bumps_matches_step_by_step(self):
+        # cycle by cycle: step never runs more than one cycle
+        self.env.reset()
+        while not self.env.done:
+            cycle = self.env.cycle
+            self.env.step()
+            self.assertEqual(self.env.cycle, cycle + 1)
+        stepped = outcome(self.env)
+        self.assertEqual(len(stepped[-1]), 5)
+
+        # fast-forwarded by run
+        self.env.reset()
+        forwarded = []
+        fast_forward = self.env.fast_forward
+        self.env.fast_forward = lambda: forwarded.append(fast_forward()) or forwarded[-1]
+        self.env.run()
+
+        self.assertTrue(any(forwarded))
+        self.assertEqual(outcome(self.env), stepped)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# Frontier
+#
+# The cells with CLEAR directions towards unknown cells, kept up to date as
+# the cells are added one by one.
+
+import os
+import sys
+import unittest
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FOLDER)
+
+from constants import VS
+from frontier import Frontier
+from search import NEIGHBOURS
+
+OPEN = [VS.CLEAR] * 8
+
+
+class TestFrontier(unittest.TestCase):
+    def test_cells_leave_the_frontier_when_their_neighbours_are_known(self):
+        frontier = Frontier()
+        frontier.add((0, 0), 1.0, OPEN)
+        self.assertIn((0, 0), frontier)
+        self.assertEqual(frontier.unknown_directions((0, 0)), list(range(8)))
+
+        for dx, dy in NEIGHBOURS[:-1]:
+            frontier.add((dx, dy), 1.0, OPEN)
+        self.assertEqual(frontier.unknown_directions((0, 0)), [7])
+        self.assertIn((0, 0), frontier)
+
+        frontier.add((-1, -1), 1.0, OPEN)
+        self.assertNotIn((0, 0), frontier)
+        self.assertEqual(len(frontier), 8)  # the ring around (0, 0)
+
+    def test_walls_and_blocked_directions(self):
+        frontier = Frontier()
+        frontier.add((0, 0), VS.OBST_WALL, OPEN)
+        self.assertNotIn((0, 0), frontier)
+
+        # only CLEAR directions lead to unknown cells
+        actions_res = [VS.WALL] * 8
+        actions_res[2] = VS.CLEAR       # right
+        frontier.add((5, 5), 1.0, actions_res)
+        self.assertEqual(frontier.unknown_directions((5, 5)), [2])
+        frontier.add((6, 5), 1.0, OPEN)
+        self.assertNotIn((5, 5), frontier)
+        self.assertIn((6, 5), frontier)
+
+    def test_adding_a_cell_again(self):
+        frontier = Frontier()
+        frontier.add((0, 0), 1.0, OPEN)
+        frontier.add((1, 0), 1.0, OPEN)
+        frontier.add((1, 0), 1.0, OPEN)
+        self.assertEqual(len(frontier.unknown_directions((0, 0))), 7)
+        self.assertEqual(frontier.unknown[(0, 0)], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# Map
+#
+# The NumPy-backed map grows towards any side while keeping the cells
+# already known at the same coordinates.
+
+import os
+import sys
+import unittest
+import numpy as np
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FOLDER)
+
+from constants import VS
+from map import Map
+
+ACTIONS_RES = [VS.CLEAR, VS.WALL, VS.END, VS.UNK, VS.CLEAR, VS.CLEAR, VS.WALL, VS.END]
+
+
+class TestMap(unittest.TestCase):
+    def test_add_and_get(self):
+        map = Map([])
+        self.assertIsNone(map.get((0, 0)))
+        self.assertFalse(map.in_map((0, 0)))
+
+        map.add((0, 0), 2.5, 7, ACTIONS_RES)
+        self.assertTrue(map.in_map((0, 0)))
+        self.assertEqual(map.get((0, 0)), (2.5, 7, ACTIONS_RES))
+        self.assertEqual(len(map), 1)
+        self.assertEqual(map.min_difficulty, 2.5)
+
+        # adding a known cell again replaces it
+        map.add((0, 0), 1.0, VS.NO_VICTIM, [VS.CLEAR] * 8)
+        self.assertEqual(map.get((0, 0)), (1.0, VS.NO_VICTIM, [VS.CLEAR] * 8))
+        self.assertEqual(len(map), 1)
+
+    def test_grows_towards_every_side(self):
+        map = Map([])
+        coords = [(0, 0), (-40, 3), (3, -70), (100, 2), (5, 65), (-1, -1)]
+        for i, coord in enumerate(coords):
+            map.add(coord, 1.0 + i, i, ACTIONS_RES)
+
+        for i, coord in enumerate(coords):
+            self.assertEqual(map.get(coord), (1.0 + i, i, ACTIONS_RES))
+            self.assertEqual(map.get_difficulty(coord), 1.0 + i)
+        self.assertEqual(len(map), len(coords))
+        self.assertIsNone(map.get_difficulty((1, 1)))
+        self.assertIsNone(map.get_difficulty((1000, -1000)))
+        self.assertIsNone(map.get((1, 1)))
+        self.assertIsNone(map.get((1000, -1000)))
+        self.assertEqual(sorted(map.known_coords().tolist()), sorted(list(c) for c in coords))
+
+        # the arrays grow by doubling
+        width, height = map.difficulty.shape
+        self.assertGreaterEqual(width, 141)
+        self.assertGreaterEqual(height, 136)
+        self.assertEqual(width % Map.INITIAL_SIZE, 0)
+
+    def test_walls_are_known_cells(self):
+        map = Map([])
+        map.add((2, 2), VS.OBST_WALL, VS.NO_VICTIM, [VS.UNK] * 8)
+        self.assertTrue(map.in_map((2, 2)))
+        self.assertEqual(map.get((2, 2))[0], VS.OBST_WALL)
+        self.assertEqual(map.min_difficulty, float('inf'))
+        self.assertTrue(np.isnan(map.difficulty).sum() == map.difficulty.size - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# Grid search
+#
+# astar, best_target and dijkstra over small maps drawn as text, checked
+# against each other and against costs worked out by hand.
+
+import os
+import sys
+import random
+import unittest
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+FOLDER = os.path.dirname(TESTS)
+sys.path[:0] = [FOLDER, TESTS]
+
+import search
+from grid import grid_map, path_cost, COST_LINE, COST_DIAG
+
+
+class TestSearch(unittest.TestCase):
+    def test_step_cost_and_octile(self):
+        self.assertEqual(search.step_cost(0, 1, COST_LINE, COST_DIAG), COST_LINE)
+        self.assertEqual(search.step_cost(-1, 1, COST_LINE, COST_DIAG), COST_DIAG)
+        self.assertEqual(search.octile((0, 0), (3, 1), COST_LINE, COST_DIAG), 2 * COST_LINE + COST_DIAG)
+
+    def test_astar_goes_around_walls_and_hard_cells(self):
+        map = grid_map(["....",
+                        ".##.",
+                        ".9#.",
+                        "...."])
+        path = search.astar(map, (0, 0), (3, 3), COST_LINE, COST_DIAG)
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (3, 3))
+        self.assertEqual(path_cost(map, path), 2 * COST_LINE + 2 * COST_LINE + COST_DIAG)
+        self.assertNotIn((1, 2), path)
+
+    def test_astar_does_not_cross_unknown_cells(self):
+        map = grid_map(["..  ..",
+                        "..  .."])
+        self.assertIsNone(search.astar(map, (0, 0), (5, 0), COST_LINE, COST_DIAG))
+        self.assertEqual(search.astar(map, (0, 0), (0, 0), COST_LINE, COST_DIAG), [(0, 0)])
+
+    def test_searches_agree_on_random_maps(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            rows = ["".join(rng.choice("....2379#") for _ in range(8)) for _ in range(8)]
+            rows[0] = "." + rows[0][1:]
+            map = grid_map(rows)
+            g_score, came_from = search.dijkstra(map, (0, 0), COST_LINE, COST_DIAG)
+
+            for goal in [(x, y) for x in range(8) for y in range(8)]:
+                path = search.astar(map, (0, 0), goal, COST_LINE, COST_DIAG)
+                if goal not in g_score:
+                    self.assertIsNone(path)
+                    continue
+                self.assertAlmostEqual(path_cost(map, path), g_score[goal])
+
+                chosen = search.best_target(map, (0, 0), {goal}, lambda cell: 0.0,
+                                            COST_LINE, COST_DIAG)
+                self.assertAlmostEqual(path_cost(map, chosen), g_score[goal])
+
+    def test_best_target_adds_the_bias(self):
+        map = grid_map(["......"])
+        targets = {(1, 0), (5, 0)}
+        near = search.best_target(map, (0, 0), targets, lambda cell: 0.0, COST_LINE, COST_DIAG)
+        self.assertEqual(near[-1], (1, 0))
+
+        far = search.best_target(map, (0, 0), targets, lambda cell: 10.0 if cell == (1, 0) else 0.0,
+                                 COST_LINE, COST_DIAG)
+        self.assertEqual(far, [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 0)])
+
+        self.assertIsNone(search.best_target(map, (0, 0), {(9, 9)}, lambda cell: 0.0,
+                                             COST_LINE, COST_DIAG))
+
+    def test_dijkstra_stops_when_asked(self):
+        map = grid_map(["......"])
+        settled = []
+
+        def stop(cell):
+            settled.append(cell)
+            return cell == (2, 0)
+
+        g_score, _ = search.dijkstra(map, (0, 0), COST_LINE, COST_DIAG, stop)
+        self.assertEqual(settled, [(0, 0), (1, 0), (2, 0)])
+        self.assertNotIn((4, 0), g_score)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# Waiting agents
+#
+# The rescuer manager waits for the end of the exploration. When the explorers
+# die before sending their final reports, the environment must wake it up so
+# the clusters are still assigned to the rescuers.
+
+import os
+import sys
+import unittest
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FOLDER)
+
+from environment import Env
+from explorer import Explorer
+from rescuer_manager import RescuerManager
+from constants import VS
+import main
+
+DATA_FOLDER = os.path.join(FOLDER, "datasets", "data_42v_20x20")
+
+
+class TestWait(unittest.TestCase):
+    def test_explorers_dying_before_the_final_report(self):
+        env = Env(DATA_FOLDER, headless=True, setup=main.create_agents, output_folder=None)
+        env.reset()
+        while env.cycle < 100:
+            env.step()
+
+        explorers = [body for body in env.agents if isinstance(body.mind, Explorer)]
+        manager = next(body.mind for body in env.agents if isinstance(body.mind, RescuerManager))
+        self.assertTrue(all(body._state == VS.ACTIVE for body in explorers))
+        self.assertFalse(manager.explored)
+
+        # the batteries of every explorer run out at the next cycle
+        for body in explorers:
+            body._end_of_time = lambda: True
+
+        while not env.done:
+            env.step()
+
+        self.assertTrue(all(body._state == VS.DEAD for body in explorers))
+        self.assertTrue(manager.context.cluster_ready)
+        self.assertFalse(env.waiting)
+
+
+if __name__ == '__main__':
+    unittest.main()
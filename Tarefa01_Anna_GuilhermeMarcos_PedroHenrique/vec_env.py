@@ -0,0 +1,44 @@
+# VecEnv Class
+#
+# Steps several environments in lockstep and batches their observations into
+# NumPy arrays: each key of Env.get_observations becomes an array whose first
+# dimension is the index of the environment.
+#
+# All the environments must have the same number of agents. An environment
+# that is done is not stepped anymore; it keeps returning its last observations
+# until the next reset.
+
+import numpy as np
+
+
+class VecEnv:
+    def __init__(self, envs):
+        """ @param envs: a list of environments (see Env), usually headless, each one
+            with a setup function for creating its agents at reset """
+        self.envs = envs
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self):
+        """ Resets all the environments
+        @return: the batched observations of the initial states """
+        return self.__batch([env.reset() for env in self.envs])
+
+    def step(self):
+        """ Advances each environment that is not done by one cycle
+        @return: the batched observations after the cycle """
+        return self.__batch([env.get_observations() if env.done else env.step()
+                             for env in self.envs])
+
+    def all_done(self):
+        """ @return: True when every environment is done """
+        return all(env.done for env in self.envs)
+
+    def get_acum_results(self):
+        """ @return: a list with the accumulated results of each environment """
+        return [env.get_acum_results() for env in self.envs]
+
+    def __batch(self, observations):
+        return {key: np.stack([np.asarray(obs[key]) for obs in observations])
+                for key in observations[0]}
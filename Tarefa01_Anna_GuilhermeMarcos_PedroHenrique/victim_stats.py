@@ -0,0 +1,41 @@
+# VictimStats Class
+#
+# A registry of victims (found or saved) with running counters. The counters
+# are updated when a victim is added, so the statistics can be read at any
+# time of the simulation without scanning the victims' lists.
+#
+# - victims: the set of victims' sequential numbers
+# - per_sev: number of victims per severity label [sev 1, sev 2, sev 3, sev 4]
+# - sum_gravity: sum of the gravity values of the victims
+
+
+class VictimStats:
+    def __init__(self):
+        self.victims = set()
+        self.per_sev = [0, 0, 0, 0]
+        self.sum_gravity = 0.0
+
+    def __len__(self):
+        return len(self.victims)
+
+    def __contains__(self, seq):
+        return seq in self.victims
+
+    def add(self, seq, sev_label, sev_value):
+        """ @param seq: the sequential number of the victim
+            @param sev_label: the severity label of the victim (1 to 4)
+            @param sev_value: the gravity value of the victim
+            @return: True if the victim was not in the registry yet """
+        if seq in self.victims:
+            return False
+
+        self.victims.add(seq)
+        self.per_sev[sev_label - 1] += 1
+        self.sum_gravity += sev_value
+        return True
+
+    def weighted(self, total_per_sev):
+        """ The number of victims weighted per severity (Veg and Vsg metrics)
+            @param total_per_sev: number of victims per severity in the environment """
+        return ((6*self.per_sev[0] + 3*self.per_sev[1] + 2*self.per_sev[2] + self.per_sev[3]) /
+                (6*total_per_sev[0] + 3*total_per_sev[1] + 2*total_per_sev[2] + total_per_sev[3]))
@@ -3,12 +3,15 @@
 
 import sys
 import os
-import pygame
 import random
 import csv
 import time
 import math
 import colorsys
+try:
+    import pygame
+except ImportError:     # pygame is only needed when the simulation is rendered
+    pygame = None
 from .abstract_agent import AbstAgent
 from .physical_agent import PhysAgent
 from .constants import VS
@@ -20,9 +23,11 @@ class Env:
     IDX_GRAVITY = 6
     IDX_SEVERITY = 7
 
-    def __init__(self, data_folder):
+    def __init__(self, data_folder, headless=False):
         # instance attributes
         self.data_folder = data_folder  # folder for the config and data files
+        # headless mode: no window, no delay and no keyboard prompts
+        self.headless = headless
         self.dic = {}          # configuration of grid and window
         self.agents = []       # list of running agents
         # list of obstacles: ]0.0, VS.OBST_WALL] float representing the multiplying factor for the walk action
@@ -268,30 +273,39 @@ class Env:
     def run(self):
         """ This public method is the engine of the simulator. It calls the deliberate
         method of each ACTIVE agent situated in the environment. Then, it updates the state
-        of the agents and of the environment"""
+        of the agents and of the environment.
+        In headless mode, pygame is not used at all and there is no delay between the cycles.
+        @return: a dictionary with the accumulated results (see get_acum_results)"""
 
         cycle = 0
-        # Set up Pygame
-        pygame.init()
 
-        # Create the font object
-        self.font = pygame.font.SysFont(None, 24)
+        if not self.headless:
+            if pygame is None:
+                print("ENV: pygame is not installed, use the headless mode")
+                exit()
 
-        # Create the window
-        self.screen = pygame.display.set_mode(
-            (self.dic["WINDOW_WIDTH"], self.dic["WINDOW_HEIGHT"]))
+            # Set up Pygame
+            pygame.init()
 
-        # Draw the environment with items
-        self.__draw()
+            # Create the font object
+            self.font = pygame.font.SysFont(None, 24)
+
+            # Create the window
+            self.screen = pygame.display.set_mode(
+                (self.dic["WINDOW_WIDTH"], self.dic["WINDOW_HEIGHT"]))
+
+            # Draw the environment with items
+            self.__draw()
 
         # Create the main loop
         running = True
 
         while running:
             # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+            if not self.headless:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
 
             # control whether or not there are active or idle agents
             active_or_idle = False
@@ -325,11 +339,12 @@ class Env:
                 elif body._state == VS.IDLE:
                     active_or_idle = True
 
-            # Update the grid after the delay
-            if self.dic["DELAY"] > 0:
-                time.sleep(self.dic["DELAY"])
+            if not self.headless:
+                # Update the grid after the delay
+                if self.dic["DELAY"] > 0:
+                    time.sleep(self.dic["DELAY"])
 
-            self.__draw()
+                self.__draw()
 
             cycle += 1
 
@@ -344,7 +359,10 @@ class Env:
                 running = False
 
         # Quit Pygame
-        pygame.quit()
+        if not self.headless:
+            pygame.quit()
+
+        return self.get_acum_results()
 
     def __print_victims(self, victims, type_str, sub, ident=3):
         """ Print either the found or the saved victims list
@@ -421,6 +439,38 @@ class Env:
             saved = body.get_saved_victims()
             self.__print_victims(saved, "saved", "s", ident=5)
 
+    def __count_victims(self, victims, sub):
+        """ Count the victims of a list per severity
+        @param victims: list of victims' sequential numbers
+        @param sub: a character representing the metric ('e' found, 's' saved)
+        @return: a dictionary {V<sub>1, ..., V<sub>4, V<sub>g} as in the CSV of the stats"""
+
+        severity = [self.severity[v] for v in victims]
+        weighted = ((6*severity.count(1) + 3*severity.count(2) + 2*severity.count(3) + severity.count(4)) /
+                    (6*self.severity.count(1)+3*self.severity.count(2)+2*self.severity.count(3)+self.severity.count(4)))
+
+        counts = {f"V{sub}{i}": severity.count(i) for i in range(1, 5)}
+        counts[f"V{sub}g"] = weighted
+        return counts
+
+    def get_acum_results(self):
+        """ Public method for getting the found and saved victims by severity for all agents.
+        It is the same data printed in the CSV lines of print_acum_results.
+        @return: a dictionary with the keys
+        - V1, V2, V3, V4, SG: the number of victims per severity and the sum of gravities
+        - Ve1, Ve2, Ve3, Ve4, Veg: found victims per severity and the weighted metric
+        - Vs1, Vs2, Vs3, Vs4, Vsg: saved victims per severity and the weighted metric"""
+
+        results = {f"V{i}": self.severity.count(i) for i in range(1, 5)}
+        results["SG"] = self.sum_gravity
+
+        found = [index for index, agents in enumerate(self.found) if agents]
+        saved = [index for index, agents in enumerate(self.saved) if agents]
+        results.update(self.__count_victims(found, "e"))
+        results.update(self.__count_victims(saved, "s"))
+
+        return results
+
     def print_acum_results(self):
         """ Print found victims and saved victims by severity for all agents.
         This is what actually happened in the environment"""
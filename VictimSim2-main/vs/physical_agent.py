@@ -1,6 +1,5 @@
 import sys
 import os
-import pygame
 import random
 import csv
 import time